@@ -0,0 +1,258 @@
+# -----------------------------------------------------------------------------
+# Getting Things GNOME! - a personal organizer for the GNOME desktop
+# Copyright (c) 2008-2013 - Lionel Dricot & Bertrand Rousseau
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+
+"""
+Command line interface to the tasks, without GTK.
+
+It loads the tasks of the default backend into a DataStore and runs one
+command:
+
+  list    print the tasks, one per line: id, due date, title and tags,
+          separated by tabs
+  search  print the tasks matching a search query, like the search bar
+  add     create a task from a line of text, like the quick add entry
+  done    mark tasks as done, given by id or by title
+  export  print the tasks as JSON
+
+Other backends (which need the main loop of GTG) are not started. Changes made
+while GTG is running are overwritten when GTG saves its tasks.
+"""
+
+import argparse
+import json
+import logging
+import sys
+
+from GTG.backends import BackendFactory
+from GTG.core.datastore import DataStore
+from GTG.core.search import InvalidQuery, search_filter
+from GTG.core.task import Task
+from GTG.gtk.browser import quick_add
+
+log = logging.getLogger(__name__)
+
+# Which tasks the commands are about
+ACTIVE, CLOSED, ALL = 'active', 'closed', 'all'
+
+# Commands which change the tasks, and need them to be saved
+WRITE_COMMANDS = {'add', 'done'}
+
+
+def build_parser():
+    """ Return the parser of the arguments of gtg-cli """
+    parser = argparse.ArgumentParser(
+        prog='gtg-cli',
+        description='Getting Things GNOME! from the command line')
+    parser.add_argument('-d', '--debug', action='store_true',
+                        help='enable debug output')
+    commands = parser.add_subparsers(dest='command', metavar='COMMAND')
+    commands.required = True
+
+    scope = argparse.ArgumentParser(add_help=False)
+    group = scope.add_mutually_exclusive_group()
+    group.add_argument('--closed', dest='scope', action='store_const',
+                       const=CLOSED, help='only the done or dismissed tasks')
+    group.add_argument('--all', dest='scope', action='store_const',
+                       const=ALL, help='all the tasks')
+    scope.add_argument('-t', '--tag', action='append', dest='tags',
+                       metavar='TAG',
+                       help='only the tasks having the tag or a subtag')
+
+    command = commands.add_parser('list', parents=[scope],
+                                  help='list the active tasks')
+    command.add_argument('--actionable', action='store_true',
+                         help='only the tasks to work on, like the '
+                              'actionable view')
+
+    command = commands.add_parser('search', parents=[scope],
+                                  help='list the tasks matching a query')
+    command.add_argument('query', nargs='+', help='search query')
+
+    command = commands.add_parser('add', help='add a task')
+    command.add_argument('text', nargs='+',
+                         help='title, with tags and dates like in the quick '
+                              'add entry (e.g. "Call Bob due:friday @work")')
+
+    command = commands.add_parser('done', help='mark tasks as done')
+    command.add_argument('tasks', nargs='+', metavar='TASK',
+                         help='id or title of a task')
+
+    command = commands.add_parser('export', parents=[scope],
+                                  help='print the tasks as JSON')
+
+    return parser
+
+
+def load_datastore():
+    """ Return a DataStore with the tasks of the default backend """
+    datastore = DataStore()
+    for backend_dic in BackendFactory().get_saved_backends_list():
+        datastore.register_backend(backend_dic)
+    return datastore
+
+
+def _select_tasks(datastore, args, default_scope):
+    """ Return the tasks chosen by the --closed, --all and --tag options,
+    or the ones of default_scope """
+    scope = args.scope or default_scope
+    tags = args.tags
+    if tags:
+        tids = set()
+        for name in tags:
+            if not name.startswith('@'):
+                name = '@' + name
+            tids.update(datastore.get_tag_task_ids(name))
+    else:
+        tids = datastore.get_all_tasks()
+
+    tasks = []
+    for tid in tids:
+        task = datastore.get_task(tid)
+        active = task.get_status() == Task.STA_ACTIVE
+        if scope == ALL or active == (scope == ACTIVE):
+            tasks.append(task)
+
+    if scope == CLOSED:
+        tasks.sort(key=lambda task: (-task.get_closed_date().sort_key(),
+                                     task.get_title()))
+    else:
+        tasks.sort(key=lambda task: (task.get_due_date().sort_key(),
+                                     task.get_title()))
+    return tasks
+
+
+def _format_task(task):
+    """ Return the line printed for a task """
+    return '\t'.join([task.get_id(), str(task.get_due_date()),
+                      task.get_title(), ' '.join(task.get_tags_name())])
+
+
+def _task_to_dict(task):
+    """ Return the exported fields of a task """
+    return {
+        'id': task.get_id(),
+        'title': task.get_title(),
+        'status': task.get_status(),
+        'tags': task.get_tags_name(),
+        'added': str(task.get_added_date()),
+        'start': str(task.get_start_date()),
+        'due': str(task.get_due_date()),
+        'closed': str(task.get_closed_date()),
+        'recurring': task.get_recurring_term() if task.get_recurring()
+        else None,
+        'parents': task.get_parents(),
+        'subtasks': task.get_children(),
+        'text': task.get_excerpt(),
+    }
+
+
+def list_tasks(datastore, args, out):
+    tasks = _select_tasks(datastore, args, ACTIVE)
+    if args.actionable:
+        workview = datastore.treefactory.workview
+        tasks = [task for task in tasks if workview(task)]
+    for task in tasks:
+        print(_format_task(task), file=out)
+    return 0
+
+
+def search_tasks(datastore, args, out):
+    try:
+        parameters = datastore.get_search_parameters(' '.join(args.query))
+    except InvalidQuery as error:
+        print(f'gtg-cli: invalid query: {error}', file=sys.stderr)
+        return 2
+    for task in _select_tasks(datastore, args, ACTIVE):
+        if search_filter(task, parameters):
+            print(_format_task(task), file=out)
+    return 0
+
+
+def add_task(datastore, args, out):
+    data = quick_add.parse(' '.join(args.text))
+    task = datastore.get_requester().new_task(newtask=True)
+
+    if data['title'] != '':
+        task.set_title(data['title'])
+        task.set_to_keep()
+
+    for tag in data['tags']:
+        task.add_tag(tag if tag.startswith('@') else '@' + tag)
+
+    task.set_start_date(data['start'])
+    task.set_due_date(data['due'])
+
+    if data['recurring']:
+        task.set_recurring(True, data['recurring'], newtask=True)
+
+    print(task.get_id(), file=out)
+    return 0
+
+
+def mark_done(datastore, args, out):
+    requester = datastore.get_requester()
+    result = 0
+    for name in args.tasks:
+        tid = name if datastore.has_task(name) else \
+            requester.get_task_id(name)
+        if tid is None:
+            print(f'gtg-cli: no active task {name!r}', file=sys.stderr)
+            result = 1
+            continue
+        datastore.get_task(tid).set_status(Task.STA_DONE)
+        print(tid, file=out)
+    return result
+
+
+def export_tasks(datastore, args, out):
+    tasks = _select_tasks(datastore, args, ALL)
+    json.dump([_task_to_dict(task) for task in tasks], out, indent=2)
+    print(file=out)
+    return 0
+
+
+COMMANDS = {
+    'list': list_tasks,
+    'search': search_tasks,
+    'add': add_task,
+    'done': mark_done,
+    'export': export_tasks,
+}
+
+
+def run(datastore, args, out=None):
+    """ Run the command of the parsed arguments on the tasks of datastore
+
+    @return: the exit status
+    """
+    return COMMANDS[args.command](datastore, args, out or sys.stdout)
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(format='%(levelname)s: %(name)s: %(message)s',
+                        level=logging.DEBUG if args.debug
+                        else logging.WARNING)
+
+    datastore = load_datastore()
+    try:
+        return run(datastore, args)
+    finally:
+        if args.command in WRITE_COMMANDS:
+            # Write the changes and stop the backends
+            datastore.save(quit=True)
@@ -0,0 +1,202 @@
+# -----------------------------------------------------------------------------
+# Getting Things GNOME! - a personal organizer for the GNOME desktop
+# Copyright (c) 2008-2013 - Lionel Dricot & Bertrand Rousseau
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+
+""" Structure of the content of a task.
+
+parse_content() splits the text of a task into a tuple of spans: plain text,
+tags (@tag), subtask references ({! uuid !}), internal links (gtg://uuid) and
+URLs. Joining the text of all the spans gives back the original content.
+
+Tasks keep the parsed spans of their content (see Task.get_content_spans()),
+so consumers don't need to scan the text again.
+"""
+
+import re
+from collections import namedtuple
+
+from GTG.core.urlregex import URL_REGEX
+
+# Regex to find GTG's tags.
+# GTG Tags start with @ and can contain alphanumeric
+# characters and/or dashes
+TAG_REGEX = re.compile(r'\B\@\w+([\-\w+\.\+\%\$\\(\)\[\]\{\}\^\=\/\*])*')
+
+# Regex to find the tags of a task: @ at the start of the text or after a
+# space, followed by the characters allowed in tag names and ending with a
+# word character (so that "@tag." is the tag @tag)
+TASK_TAG_REGEX = re.compile(r'(?<!\S)@[\w\/\.\-\:\&]*\w')
+
+# Regex to find subtask references, like {! uuid !}
+SUBTASK_REGEX = re.compile(r'\{!\s*(.+?)\s*!\}')
+
+# Regex to find internal links
+# Starts with gtg:// followed by a UUID.
+INTERNAL_REGEX = re.compile((r'gtg:\/\/'
+                             r'[0-9a-f]{8}(?:-[0-9a-f]{4}){3}-[0-9a-f]{12}'),
+                            re.IGNORECASE)
+
+TEXT = 'text'
+TAG = 'tag'
+SUBTASK = 'subtask'
+INTERNAL_LINK = 'internal_link'
+URL = 'url'
+
+# All the kinds of spans but TEXT, in order of precedence
+_CONTENT_REGEX = re.compile('|'.join(
+    f'(?P<{kind}>{regex.pattern})' for kind, regex in (
+        (SUBTASK, SUBTASK_REGEX),
+        (INTERNAL_LINK, INTERNAL_REGEX),
+        (URL, URL_REGEX),
+        (TAG, TASK_TAG_REGEX),
+    )), re.IGNORECASE)
+
+Span = namedtuple('Span', ['kind', 'text', 'value'])
+Span.__doc__ = """ A piece of content.
+
+value is the tag name for tags, the task id for subtasks and internal links,
+the URL for URLs and the text itself for plain text.
+"""
+
+
+def parse_content(text):
+    """ Split text into a tuple of spans """
+    spans = []
+    position = 0
+    for match in _CONTENT_REGEX.finditer(text or ''):
+        start, end = match.span()
+        if start > position:
+            chunk = text[position:start]
+            spans.append(Span(TEXT, chunk, chunk))
+
+        kind = match.lastgroup
+        matched = match.group(0)
+        if kind == SUBTASK:
+            value = SUBTASK_REGEX.match(matched).group(1)
+        elif kind == INTERNAL_LINK:
+            value = matched[len('gtg://'):]
+        else:
+            value = matched
+        spans.append(Span(kind, matched, value))
+        position = end
+
+    if text and position < len(text):
+        chunk = text[position:]
+        spans.append(Span(TEXT, chunk, chunk))
+    return tuple(spans)
+
+
+def render_content(spans):
+    """ Join spans back into text """
+    return ''.join(span.text for span in spans)
+
+
+def _remove_separator(spans, index, separators):
+    """ Remove the first matching separator from the text span at index """
+    if index < len(spans) and spans[index].kind == TEXT:
+        text = spans[index].text
+        for sep in separators:
+            if text.startswith(sep):
+                text = text[len(sep):]
+                spans[index] = Span(TEXT, text, text)
+                return True
+    return False
+
+
+def _remove_separator_before(spans, index, separators):
+    """ Remove the first matching separator ending the text span at index """
+    if index >= 0 and spans[index].kind == TEXT:
+        text = spans[index].text
+        for sep in separators:
+            if text.endswith(sep):
+                text = text[:-len(sep)]
+                spans[index] = Span(TEXT, text, text)
+                return True
+    return False
+
+
+def strip_tags(spans, tagnames):
+    """ Return spans without the given tags and the commas following them """
+    tagnames = {name if name.startswith('@') else '@' + name
+                for name in tagnames}
+    result = list(spans)
+    index = 0
+    while index < len(result):
+        span = result[index]
+        if span.kind == TAG and span.value in tagnames:
+            del result[index]
+            _remove_separator(result, index, (', ', ','))
+        else:
+            index += 1
+    return tuple(result)
+
+
+def remove_tag(spans, tagname):
+    """ Remove a tag from the content.
+
+    A tag in a list of tags ('@tag, ') or followed by an empty line disappears
+    with its separator; a tag within the text is replaced by its bare name.
+    """
+    if not tagname.startswith('@'):
+        tagname = '@' + tagname
+    result = list(spans)
+    for index, span in enumerate(result):
+        if span.kind == TAG and span.value == tagname:
+            if _remove_separator(result, index + 1, ('\n\n', ', ')):
+                result[index] = Span(TEXT, '', '')
+            else:
+                bare = tagname[1:]
+                result[index] = Span(TEXT, bare, bare)
+    return tuple(span for span in result if span.text)
+
+
+def rename_tag(spans, old, new):
+    """ Replace the tag old by the tag new
+
+    If new is in the content already, an occurrence of old in a list of tags
+    ('@old, ') disappears with its separator instead of repeating new.
+    """
+    has_new = any(span.kind == TAG and span.value == new for span in spans)
+    result = list(spans)
+    for index, span in enumerate(result):
+        if span.kind != TAG or span.value != old:
+            continue
+        if has_new and (
+                _remove_separator(result, index + 1, (', ', ',')) or
+                _remove_separator_before(result, index - 1, (', ', ','))):
+            result[index] = Span(TEXT, '', '')
+        else:
+            result[index] = Span(TAG, new, new)
+            has_new = True
+    return tuple(span for span in result if span.text)
+
+
+def get_subtask_ids(spans):
+    """ Return the ids of the subtasks referenced by the spans """
+    return [span.value for span in spans if span.kind == SUBTASK]
+
+
+def strip_spans(spans):
+    """ Remove the leading and trailing whitespace, like str.strip() """
+    result = list(spans)
+    if result and result[0].kind == TEXT:
+        text = result[0].text.lstrip()
+        result[0] = Span(TEXT, text, text)
+    if result and result[-1].kind == TEXT:
+        text = result[-1].text.rstrip()
+        result[-1] = Span(TEXT, text, text)
+    return tuple(span for span in result if span.text)
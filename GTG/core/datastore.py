@@ -21,16 +21,26 @@ Contains the Datastore object, which is the manager of all the active backends
 """
 
 from collections import deque
+from contextlib import contextmanager
+from datetime import date, timedelta
 import threading
 import logging
 import uuid
 
+from gi.repository import GLib
+
 from GTG.backends.backend_signals import BackendSignals
 from GTG.backends.generic_backend import GenericBackend
 from GTG.core.config import CoreConfig
+from GTG.core.dateindex import DateBoundaryIndex
+from GTG.core.filterstats import FilterStats
 from GTG.core import requester
-from GTG.core.search import parse_search_query, search_filter, InvalidQuery
-from GTG.core.tag import Tag, SEARCH_TAG, SEARCH_TAG_PREFIX
+from GTG.core.search import (parse_search_query, search_filter, InvalidQuery,
+                             PagedSearch)
+from GTG.core.tag import (Tag, SEARCH_TAG, SEARCH_TAG_PREFIX, ALLTASKS_TAG,
+                          NOTAG_TAG)
+from GTG.core.tagindex import TagIndex
+from GTG.core.textindex import FuzzyIndex, TextIndex
 from GTG.core.task import Task
 from GTG.core.treefactory import TreeFactory
 from GTG.core.borg import Borg
@@ -38,6 +48,8 @@ from GTG.core.borg import Borg
 
 log = logging.getLogger(__name__)
 TAG_XMLROOT = "tagstore"
+# Delay (in ms) to wait for more tag changes before saving the tag tree
+TAGTREE_SAVE_DELAY = 1000
 
 
 class DataStore():
@@ -55,11 +67,46 @@ class DataStore():
         """
         # dictionary {backend_name_string: Backend instance}
         self.backends = {}
-        self.treefactory = TreeFactory()
+        # Time spent in the filters, see GTG.core.filterstats
+        self.filter_stats = FilterStats()
+        self.treefactory = TreeFactory(self.filter_stats)
         self._tasks = self.treefactory.get_tasks_tree()
         self.requester = requester.Requester(self, global_conf)
+        # Tasks of each tag, kept up to date as tasks change
+        # Incremented whenever a task changes, so that results cached about
+        # the tasks (like the results of the workview filter) are dropped
+        self.tasks_generation = 0
+        self._tag_index = TagIndex()
+        self._text_index = TextIndex(self._get_task_search_text)
+        self._fuzzy_index = FuzzyIndex(self._get_task_fuzzy_text)
+        self._date_index = DateBoundaryIndex(self._get_task_boundary_days)
+        # Saved searches: tag name -> parameters of their filter, and
+        # task id -> names of the saved searches matching the task
+        self._saved_searches = {}
+        self._task_saved_searches = {}
+        self._task_saved_searches_day = None
+        # Closed tasks: task id -> sort key of its closing date, and the ids
+        # sorted the most recently closed first (None until needed again)
+        self._closed_keys = {}
+        self._closed_sorted = None
+        taskview = self._tasks.get_main_view()
+        taskview.register_cllbck('node-added', self._on_task_added)
+        for event in ('node-added', 'node-modified'):
+            taskview.register_cllbck(event, self._on_task_changed)
+        taskview.register_cllbck('node-deleted', self._on_task_deleted)
         self.tagfile_loaded = False
+        # Tag hierarchy closure: tag name -> frozenset of the tag and all its
+        # descendants. _tag_links keeps the parents and children seen for
+        # each tag to detect reparenting done directly through liblarch.
+        self._tag_closure = {}
+        self._tag_links = {}
+        # Names of the nonactionable tags and of their descendants, or None
+        # until it is needed again
+        self._nonactionable_tags = None
         self._tagstore = self.treefactory.get_tags_tree(self.requester)
+        tagview = self._tagstore.get_main_view()
+        for event in ('node-added', 'node-modified', 'node-deleted'):
+            tagview.register_cllbck(event, self._on_tag_changed)
         self._backend_signals = BackendSignals()
         self.conf = global_conf
         self.tag_idmap = {}
@@ -75,6 +122,23 @@ class DataStore():
                                       self._activate_non_default_backends)
         self._backend_mutex = threading.Lock()
 
+        # Nesting level of batch() and the ids of the tasks whose sync has
+        # been deferred until the end of the batch (a dict keeps the order)
+        self._batch_depth = 0
+        self._deferred_syncs = {}
+        # When coalesce_syncs is enabled, syncs outside of a batch are
+        # deferred too and flushed once per main loop iteration
+        self.coalesce_syncs = False
+        self._sync_idle_id = None
+        # Backend threads sync tasks too: protects the deferred syncs and
+        # the idle callback
+        self._sync_lock = threading.Lock()
+        # Pending save of the tag tree, see queue_save_tagtree()
+        self._tagtree_save_id = None
+        # Tasks being filtered again in the views only, see
+        # refresh_task_views()
+        self._view_refreshes = set()
+
     # Accessor to embedded objects in DataStore ##############################
     def get_tagstore(self):
         """
@@ -107,9 +171,10 @@ class DataStore():
         if self._tagstore.has_node(name):
             raise IndexError(f'tag {name} was already in the datastore')
 
+        filter_func = self.filter_stats.wrap(name, filter_func)
         self._tasks.add_filter(name, filter_func, parameters=parameters)
         self._tagstore.add_node(tag, parent_id=parent_id)
-        tag.set_save_callback(self.save)
+        tag.set_save_callback(self.queue_save_tagtree)
 
     def new_tag(self, name, attributes={}, tid=None):
         """
@@ -129,7 +194,7 @@ class DataStore():
         @returns GTG.core.tag.Tag: the new search tag/None for a invalid query
         """
         try:
-            parameters = parse_search_query(query)
+            parameters = self.get_search_parameters(query)
         except InvalidQuery as error:
             log.warning("Problem with parsing query %r (skipping): %s", query, error.message)
             return None
@@ -143,6 +208,8 @@ class DataStore():
         tag = Tag(name, req=self.requester, attributes=init_attr, tid=tid)
         self._add_new_tag(name, tag, search_filter, parameters,
                           parent_id=SEARCH_TAG)
+        self._saved_searches[name] = parameters
+        self._task_saved_searches.clear()
 
         if save:
             self.save_tagtree()
@@ -153,6 +220,8 @@ class DataStore():
         """ Removes a tag from the tagtree """
         if self._tagstore.has_node(name):
             self._tagstore.del_node(name)
+            if self._saved_searches.pop(name, None) is not None:
+                self._task_saved_searches.clear()
             self.save_tagtree()
         else:
             raise IndexError(f"There is no tag {name}")
@@ -160,43 +229,34 @@ class DataStore():
     def rename_tag(self, oldname, newname):
         """ Give a tag a new name
 
-        This function is quite high-level method. Right now,
-        only renaming search bookmarks are implemented by removing
-        the old one and creating almost identical one with the new name.
+        The tag is replaced in the tags and the content of its tasks in a
+        single batch, and the new tag takes over the attributes, the id and
+        the place in the hierarchy of the old one. If a tag called newname
+        already exists, both tags are merged (see merge_tags()).
 
-        NOTE: Implementation for regular tasks must be much more robust.
-        You have to replace all occurences of tag name in tasks descriptions,
-        their parameters and backend settings (synchronize only certain tags).
-
-        Have a fun with implementing it!
+        Search bookmarks are renamed by removing the old one and creating
+        almost identical one with the new name.
         """
 
         tag = self.get_tag(oldname)
 
         if not tag.is_search_tag():
-            for task_id in tag.get_related_tasks():
-
-                # Store old tag attributes
-                color = tag.get_attribute("color")
-                icon = tag.get_attribute("icon")
-                tid = tag.tid
-
-                my_task = self.get_task(task_id)
-                my_task.rename_tag(oldname, newname)
-
-                # Restore attributes on tag
-                new_tag = self.get_tag(newname)
-                new_tag.tid = tid
-
-                if color:
-                    new_tag.set_attribute("color", color)
-
-                if icon:
-                    new_tag.set_attribute("icon", icon)
-
-            self.remove_tag(oldname)
-            self.save_tagtree()
+            if self.get_tag(newname) is not None:
+                self.merge_tags(oldname, newname)
+                return None
 
+            attributes = {name: tag.get_attribute(name)
+                          for name in tag.get_all_attributes(butname=True)}
+            parents = tag.get_parents()
+            parameters = {'tag': newname}
+            new_tag = Tag(newname, req=self.requester, tid=tag.tid)
+            self._add_new_tag(newname, new_tag, self.treefactory.tag_filter,
+                              parameters,
+                              parent_id=parents[0] if parents else None)
+            for parent_id in parents[1:]:
+                new_tag.add_parent(parent_id)
+            new_tag.set_attributes(attributes)
+            self._move_tag(tag, new_tag)
             return None
 
         query = tag.get_attribute("query")
@@ -213,6 +273,45 @@ class DataStore():
 
         self.new_search_tag(label, query, {}, tag.tid)
 
+    def merge_tags(self, oldname, newname):
+        """ Merge the tag oldname into the existing tag newname
+
+        The tasks and the subtags of oldname are moved to newname, which
+        keeps its own attributes and only takes the ones it lacks.
+        """
+        tag = self.get_tag(oldname)
+        new_tag = self.get_tag(newname)
+        if tag is None or new_tag is None:
+            raise IndexError(f"Can't merge {oldname} into {newname}")
+
+        new_tag.set_attributes({
+            name: tag.get_attribute(name)
+            for name in tag.get_all_attributes(butname=True)
+            if new_tag.get_attribute(name) is None})
+        self._move_tag(tag, new_tag)
+
+    def _move_tag(self, tag, new_tag):
+        """ Replace tag by new_tag in all tasks and in the tag tree, then
+        remove tag """
+        oldname, newname = tag.get_name(), new_tag.get_name()
+        task_ids = list(self._tag_index.get_tasks([oldname]))
+
+        with self.batch():
+            for task_id in task_ids:
+                task = self.get_task(task_id)
+                if task is not None:
+                    task.replace_tag(oldname, newname)
+
+        for child_name in tag.get_children():
+            child = self.get_tag(child_name)
+            if child is not None and child_name != newname:
+                child.remove_parent(oldname)
+                child.add_parent(newname)
+
+        self._tagstore.del_node(oldname)
+        new_tag.modified()
+        self.save_tagtree()
+
     def get_tag(self, tagname):
         """
         Returns tag object
@@ -224,6 +323,308 @@ class DataStore():
         else:
             return None
 
+    def get_tag_closure(self, tagname):
+        """
+        Returns the set made of the tag and all its descendant tags
+
+        @return frozenset of tag names
+        """
+        try:
+            return self._tag_closure[tagname]
+        except KeyError:
+            pass
+
+        closure = {tagname}
+        to_visit = [tagname]
+        while to_visit:
+            tag = self.get_tag(to_visit.pop())
+            if tag is None:
+                continue
+            for child_name in tag.get_children():
+                if child_name not in closure:
+                    closure.add(child_name)
+                    to_visit.append(child_name)
+
+        closure = frozenset(closure)
+        self._tag_closure[tagname] = closure
+        return closure
+
+    def invalidate_tag_closure(self):
+        """ Forget all tag closures, they are rebuilt on demand """
+        self._tag_closure.clear()
+        self._nonactionable_tags = None
+
+    def get_nonactionable_tags(self):
+        """
+        Returns the names of the tags whose tasks are hidden from the
+        workview: the nonactionable tags and their descendants
+
+        @return frozenset of tag names
+        """
+        if self._nonactionable_tags is None:
+            names = set()
+            for tagname in self._tagstore.get_main_view().get_all_nodes():
+                tag = self.get_tag(tagname)
+                if tag.get_attribute('nonactionable') == 'True':
+                    names |= self.get_tag_closure(tagname)
+            self._nonactionable_tags = frozenset(names)
+        return self._nonactionable_tags
+
+    def invalidate_nonactionable_tags(self):
+        """ Forget the nonactionable tags, after an attribute changed """
+        self._nonactionable_tags = None
+
+    def _on_tag_changed(self, tagname, path=None):
+        """ Invalidate tag closures if the hierarchy of the tag changed """
+        tag = self.get_tag(tagname)
+        if tag is None:
+            links = None
+        else:
+            links = (tuple(tag.get_parents()), tuple(tag.get_children()))
+
+        if self._tag_links.get(tagname) != links:
+            if links is None:
+                del self._tag_links[tagname]
+            else:
+                self._tag_links[tagname] = links
+            self.invalidate_tag_closure()
+
+    def get_tag_task_count(self, tagname, active_only=False):
+        """
+        Returns the number of tasks having the tag or one of its descendants
+
+        The special tags count all the tasks and the tasks without tags.
+        """
+        if tagname == ALLTASKS_TAG:
+            return self._tag_index.count_all(active_only)
+        if tagname == NOTAG_TAG:
+            return self._tag_index.count_untagged(active_only)
+        return self._tag_index.count(self.get_tag_closure(tagname),
+                                     active_only)
+
+    def get_tag_task_ids(self, tagname, active_only=False):
+        """
+        Returns the ids of the tasks having the tag or one of its descendants
+
+        Like get_tag_task_count(), the special tags give all the tasks and
+        the tasks without tags. The result is a new list.
+        """
+        if tagname == ALLTASKS_TAG:
+            return list(self._tag_index.get_all(active_only))
+        if tagname == NOTAG_TAG:
+            return list(self._tag_index.get_untagged(active_only))
+        return list(self._tag_index.get_tasks(self.get_tag_closure(tagname),
+                                              active_only))
+
+    def get_task_ids_with_tags(self, tagnames):
+        """
+        Returns the set of the ids of the tasks having any of the given
+        tags themselves (descendant tags are not taken into account)
+
+        The returned set must not be modified.
+        """
+        return self._tag_index.get_tasks(tagnames)
+
+    def update_task_tags(self, tid):
+        """ Update the tag counts of a task right away """
+        task = self.get_task(tid)
+        if task is None:
+            changed = self._tag_index.remove(tid)
+        else:
+            changed = self._tag_index.update(
+                tid, task.get_tags_name(),
+                task.get_status() == Task.STA_ACTIVE)
+        self._notify_tag_counts(changed)
+
+    def _on_task_added(self, tid, path=None):
+        """ Count a task loaded after its parents in their active subtasks """
+        task = self.get_task(tid)
+        if task is None:
+            return
+        for parent_id in task.get_parents():
+            parent = self.get_task(parent_id)
+            if parent is not None:
+                parent.update_active_child(tid)
+
+    def _on_task_changed(self, tid, path=None):
+        self.update_task_tags(tid)
+        self._text_index.invalidate(tid)
+        self._fuzzy_index.invalidate(tid)
+        self._date_index.invalidate(tid)
+        self._task_saved_searches.pop(tid, None)
+        self._update_closed_task(tid)
+
+    def _on_task_deleted(self, tid, path=None):
+        self._notify_tag_counts(self._tag_index.remove(tid))
+        self._text_index.invalidate(tid)
+        self._fuzzy_index.invalidate(tid)
+        self._date_index.invalidate(tid)
+        self._task_saved_searches.pop(tid, None)
+        self._update_closed_task(tid)
+
+    def _update_closed_task(self, tid):
+        """ Keep the closing date of task tid if it is closed """
+        task = self.get_task(tid)
+        key = None
+        if task is not None and \
+                task.get_status() in (Task.STA_DONE, Task.STA_DISMISSED):
+            key = task.get_closed_date().sort_key()
+        if self._closed_keys.get(tid) != key:
+            if key is None:
+                del self._closed_keys[tid]
+            else:
+                self._closed_keys[tid] = key
+            self._closed_sorted = None
+
+    def get_task_saved_searches(self, tid):
+        """
+        Returns the names of the saved searches matching a task
+
+        The result is kept until the task or the saved searches change (or
+        the day, for searches relative to today).
+        """
+        today = date.today()
+        if today != self._task_saved_searches_day:
+            self._task_saved_searches.clear()
+            self._task_saved_searches_day = today
+
+        try:
+            return self._task_saved_searches[tid]
+        except KeyError:
+            pass
+
+        task = self.get_task(tid)
+        if task is None:
+            return ()
+        names = tuple(name for name, parameters in self._saved_searches.items()
+                      if search_filter(task, parameters))
+        self._task_saved_searches[tid] = names
+        return names
+
+    def _get_task_search_text(self, tid):
+        """ Return the text of a task searched for words, or None """
+        task = self.get_task(tid)
+        if task is None:
+            return None
+        return task.get_search_text() + '\n' + task.get_title().lower()
+
+    def _get_task_fuzzy_text(self, tid):
+        """ Return the title and the tags of a task, or None """
+        task = self.get_task(tid)
+        if task is None:
+            return None
+        return ' '.join([task.get_title()] + task.get_tags_name())
+
+    def _get_task_boundary_days(self, tid):
+        """
+        Return the days at which the filters of a task may change, or None
+
+        A task starts on its start date (or the day after, early in the
+        morning), and is due the day before its due date, on it and after it.
+        Fuzzy dates stay at the same distance from today.
+        """
+        task = self.get_task(tid)
+        if task is None:
+            return None
+        one_day = timedelta(days=1)
+        days = []
+        start = task.get_start_date()
+        if start and not start.is_fuzzy():
+            start = start.date()
+            days += [start, start + one_day]
+        due = task.get_due_date()
+        if due and not due.is_fuzzy():
+            due = due.date()
+            days += [due - one_day, due, due + one_day]
+        return days
+
+    def get_tasks_changed_by_day(self, today=None):
+        """
+        Returns the ids of the tasks whose filters may have changed since
+        the previous call because the day changed (see
+        GTG.core.dateindex.DateBoundaryIndex)
+        """
+        return self._date_index.pop_changed(today)
+
+    def refresh_task_views(self, tids):
+        """
+        Filter the tasks tids again in the views, without syncing them to the
+        backends: their data didn't change (e.g. the day did).
+        """
+        tids = set(tids)
+        self._view_refreshes.update(tids)
+        try:
+            for tid in tids:
+                task = self.get_task(tid)
+                if task is not None:
+                    task.modified()
+        finally:
+            self._view_refreshes.difference_update(tids)
+
+    def is_view_refresh(self, tid):
+        """ Returns True while task tid is refreshed by refresh_task_views() """
+        return tid in self._view_refreshes
+
+    def find_tasks(self, text, limit=10):
+        """
+        Returns the ids of the tasks whose title and tags best match text,
+        best first. Small typos are tolerated.
+
+        @param limit: maximum number of tasks returned
+        """
+        return self._fuzzy_index.search(text, limit)
+
+    def get_tasks_titled(self, title):
+        """
+        Returns the ids of the tasks whose title is title, ignoring case
+        """
+        title = title.lower()
+        return [tid for tid in self._fuzzy_index.get_candidates(title)
+                if self.get_task(tid).get_title().lower() == title]
+
+    def search_closed_tasks(self, parameters, page_size=100):
+        """
+        Returns a GTG.core.search.PagedSearch of the closed tasks, the most
+        recently closed first
+
+        @param parameters: search parameters, see get_search_parameters()
+        """
+        # Sorted again only when the closed tasks changed, not for each
+        # search
+        if self._closed_sorted is None:
+            self._closed_sorted = sorted(self._closed_keys,
+                                         key=self._closed_keys.get,
+                                         reverse=True)
+        return PagedSearch(self._closed_sorted, self.get_task,
+                           parameters, page_size)
+
+    def get_search_parameters(self, query):
+        """
+        Returns the parameters of search_filter() for query, which look up
+        the words of the query in the text index of the tasks and !fuzzy in
+        their fuzzy index
+
+        Raises InvalidQuery if the query is not valid.
+        """
+        parameters = parse_search_query(query)
+        parameters['text_index'] = self._text_index
+        parameters['fuzzy_index'] = self._fuzzy_index
+        return parameters
+
+    def _notify_tag_counts(self, tagnames):
+        """ Refresh the tags whose counts changed and their ancestors """
+        to_visit = list(tagnames)
+        visited = set(to_visit)
+        while to_visit:
+            tag = self.get_tag(to_visit.pop())
+            if tag is None:
+                continue
+            tag.modified()
+            for parent_name in tag.get_parents():
+                if parent_name not in visited:
+                    visited.add(parent_name)
+                    to_visit.append(parent_name)
+
     def load_tag_tree(self, tag_tree):
         """
         Loads the tag tree from a xml file
@@ -288,9 +689,28 @@ class DataStore():
         except KeyError:
             return
 
+    def queue_save_tagtree(self):
+        """
+        Saves the tag tree once no tag has changed for TAGTREE_SAVE_DELAY,
+        so a burst of changes (like browsing colors) is saved once
+        """
+        if self._tagtree_save_id is not None:
+            GLib.source_remove(self._tagtree_save_id)
+        self._tagtree_save_id = GLib.timeout_add(TAGTREE_SAVE_DELAY,
+                                                 self._on_save_tagtree)
+
+    def _on_save_tagtree(self):
+        self._tagtree_save_id = None
+        self.save_tagtree()
+        return False
+
     def save_tagtree(self):
         """ Saves the tag tree to an XML file """
 
+        if self._tagtree_save_id is not None:
+            GLib.source_remove(self._tagtree_save_id)
+            self._tagtree_save_id = None
+
         if not self.tagfile_loaded:
             return
 
@@ -357,9 +777,30 @@ class DataStore():
         @return: The task object that was created.
         """
         task = self.task_factory(str(uuid.uuid4()), True)
+        self.tasks_changed()
         self._tasks.add_node(task)
         return task
 
+    def tasks_changed(self):
+        """
+        Drops the results cached about the tasks, as a task is about to be
+        added or has changed. It must be called before liblarch is told.
+        """
+        self.tasks_generation += 1
+
+    def add_new_tasks(self, tasks):
+        """
+        Adds tasks built outside of the task tree in a single batch.
+
+        @param tasks: a list of (task, parent id) tuples, where parent id is
+                      None for top tasks. Parents must come before their
+                      children.
+        """
+        self.tasks_changed()
+        with self.batch():
+            for task, parent_id in tasks:
+                self._tasks.add_node(task, parent_id=parent_id)
+
     def push_task(self, task):
         """
         Adds the given task object to the task tree. In other words, registers
@@ -372,6 +813,7 @@ class DataStore():
         """
 
         def adding(task):
+            self.tasks_changed()
             self._tasks.add_node(task)
             task.set_loaded()
             if self.is_default_backend_loaded:
@@ -383,6 +825,73 @@ class DataStore():
             adding(task)
             return True
 
+    @contextmanager
+    def batch(self):
+        """
+        Context manager grouping modifications of many tasks.
+
+        Within the batch, Task.sync() only records the task. When the
+        outermost batch ends, each touched task is notified to liblarch
+        once, so filters and views are updated once per task and backends
+        receive the whole batch in a single queue flush.
+        """
+        self._batch_depth += 1
+        try:
+            yield
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                self.flush_deferred_syncs()
+
+    def defer_sync(self, tid):
+        """
+        Records that task tid needs to be synced, if in a batch or if syncs
+        are coalesced until the main loop is idle
+
+        @return bool: True if the sync has been deferred
+        """
+        with self._sync_lock:
+            if self._batch_depth == 0:
+                if not self.coalesce_syncs:
+                    return False
+                if self._sync_idle_id is None:
+                    self._sync_idle_id = GLib.idle_add(self._on_sync_idle)
+            self._deferred_syncs[tid] = True
+            return True
+
+    def refresh_task(self, tid):
+        """
+        Notify liblarch that task tid must be filtered again although its
+        data didn't change (e.g. its children changed), once per batch
+        """
+        if not self.defer_sync(tid):
+            task = self.get_task(tid)
+            if task is not None:
+                task.modified()
+
+    def _on_sync_idle(self):
+        with self._sync_lock:
+            self._sync_idle_id = None
+        self.flush_deferred_syncs()
+        return False
+
+    def flush_deferred_syncs(self):
+        """
+        Notify liblarch of every task whose sync has been deferred.
+
+        Called when a batch ends and from the idle callback. Call it directly
+        when the pending syncs must land right away (quitting, tests).
+        """
+        with self._sync_lock:
+            if self._sync_idle_id is not None:
+                GLib.source_remove(self._sync_idle_id)
+                self._sync_idle_id = None
+            deferred, self._deferred_syncs = self._deferred_syncs, {}
+        for tid in deferred:
+            task = self.get_task(tid)
+            if task is not None and task.is_loaded():
+                task.modified()
+
     ##########################################################################
     # Backends functions
     ##########################################################################
@@ -593,6 +1102,7 @@ class DataStore():
 
         @param quit: If quit is true, backends are shut down
         """
+        self.flush_deferred_syncs()
 
         try:
             self.start_get_tasks_thread.join()
@@ -634,7 +1144,7 @@ class DataStore():
                 value = b.cast_param_type_to_string(param_type, value)
                 config.set(str(key), value)
 
-        config.save()
+            config.save()
 
         #  Saving the tagstore
         self.save_tagtree()
@@ -673,12 +1183,14 @@ class TaskSource():
         """
         self.backend = backend
         self.req = requester
+        self.datastore = datastore
         self.backend.register_datastore(datastore)
         self.tasktree = datastore.get_tasks_tree().get_main_view()
         self.to_set = deque()
         self.to_remove = deque()
         self.please_quit = False
-        self.task_filter = self.get_task_filter_for_backend()
+        self.task_filter = datastore.filter_stats.wrap(
+            'backend:' + backend.get_id(), self.get_task_filter_for_backend())
         if log.isEnabledFor(logging.DEBUG):
             self.timer_timestep = 5
         else:
@@ -704,26 +1216,20 @@ class TaskSource():
                  True/False whether the task should be stored or not
         """
 
-        def backend_filter(req, task, parameters):
+        attached_tags = set(self.backend.get_attached_tags())
+        if ALLTASKS_TAG in attached_tags:
+            return lambda task: True
+
+        def backend_filter(task):
             """
-            Filter that checks if two tags sets intersect. It is used to check
-            if a task should be stored inside a backend
+            Filter that checks if the task has one of the attached tags. It
+            is used to check if a task should be stored inside a backend
             @param task: a task object
-            @param tags_to_match_set: a *set* of tag names
             """
-            try:
-                tags_to_match_set = parameters['tags']
-            except KeyError:
-                return []
-            all_tasks_tag = req.get_alltag_tag().get_name()
-            if all_tasks_tag in tags_to_match_set:
-                return True
-            task_tags = set(task.get_tags_name())
-            return task_tags.intersection(tags_to_match_set)
-
-        attached_tags = self.backend.get_attached_tags()
-        return lambda task: backend_filter(self.requester, task,
-                                           {"tags": set(attached_tags)})
+            return task.get_id() in \
+                self.datastore.get_task_ids_with_tags(attached_tags)
+
+        return backend_filter
 
     def should_task_id_be_stored(self, task_id):
         """
@@ -738,6 +1244,11 @@ class TaskSource():
 #        return self.task_filter(task)
         return True
 
+    def _on_task_modified(self, tid, path=None):
+        """ Queues the modified task, unless only the views are refreshed """
+        if not self.datastore.is_view_refresh(tid):
+            self.queue_set_task(tid, path)
+
     def queue_set_task(self, tid, path=None):
         """
         Updates the task in the DataStore.  Actually, it adds the task to a
@@ -826,7 +1337,7 @@ class TaskSource():
                 'node-added', self.queue_set_task)
         if not self.set_task_handle:
             self.set_task_handle = self.tasktree.register_cllbck(
-                'node-modified', self.queue_set_task)
+                'node-modified', self._on_task_modified)
         if not self.remove_task_handle:
             self.remove_task_handle = self.tasktree.register_cllbck(
                 'node-deleted', self.queue_remove_task)
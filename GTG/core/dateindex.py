@@ -0,0 +1,84 @@
+# -----------------------------------------------------------------------------
+# Getting Things GNOME! - a personal organizer for the GNOME desktop
+# Copyright (c) 2008-2013 - Lionel Dricot & Bertrand Rousseau
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+
+"""
+Index of the days at which the filters of the tasks may change, so that only
+those tasks are filtered again when the day changes.
+"""
+
+import heapq
+from datetime import date
+
+
+class DateBoundaryIndex():
+    """
+    Keeps the tasks in a heap ordered by the next day at which the result of
+    their filters may change (e.g. the day they start or the day before they
+    are due).
+
+    The days of a task are given by the function get_days(tid), which
+    returns a list of datetime.date, or None if the task doesn't exist
+    anymore. Tasks marked by invalidate() are looked at again on the next
+    call to pop_changed().
+    """
+
+    def __init__(self, get_days, today=None):
+        self._get_days = get_days
+        self._today = today or date.today()
+        # heap of (day, task id); entries whose day is not the one in
+        # self._next_day are outdated and skipped
+        self._heap = []
+        self._next_day = {}
+        self._dirty = set()
+
+    def invalidate(self, tid):
+        """ Mark the days of a task as changed (or the task as removed) """
+        self._dirty.add(tid)
+
+    def _push(self, tid):
+        """ Put a task in the heap at its first day after today """
+        days = self._get_days(tid)
+        next_day = min((day for day in days or () if day > self._today),
+                       default=None)
+        if next_day is None:
+            self._next_day.pop(tid, None)
+        elif next_day != self._next_day.get(tid):
+            self._next_day[tid] = next_day
+            heapq.heappush(self._heap, (next_day, tid))
+
+    def pop_changed(self, today=None):
+        """
+        Move to the day today and return the ids of the tasks having one of
+        their days since the previous call
+        """
+        for tid in self._dirty:
+            self._push(tid)
+        self._dirty.clear()
+
+        today = today or date.today()
+        changed = set()
+        while self._heap and self._heap[0][0] <= today:
+            day, tid = heapq.heappop(self._heap)
+            if self._next_day.get(tid) == day:
+                del self._next_day[tid]
+                changed.add(tid)
+
+        self._today = today
+        for tid in changed:
+            self._push(tid)
+        return changed
@@ -25,8 +25,10 @@ Date.parse() parses all possible representations of a datetime.date. """
 
 import calendar
 import locale
+from collections import OrderedDict
 from datetime import date, datetime, timedelta, timezone
 from enum import Enum
+from functools import lru_cache
 from gettext import gettext as _
 from gettext import ngettext
 
@@ -36,6 +38,12 @@ __all__ = ['Date', 'Accuracy']
 LOCAL_TIMEZONE = datetime.now(timezone.utc).astimezone().tzinfo
 NOW, SOON, SOMEDAY, NODATE = list(range(4))
 
+# Number of days from today of the fuzzy dates when compared to real dates
+FUZZY_DAYS = {SOON: 15, SOMEDAY: 365, NODATE: 9999}
+
+# Hour of the day from which the tasks starting that day are started
+DAY_START_HOUR = 5
+
 # Localized strings for fuzzy values
 STRINGS = {
     # Translators: Used for display
@@ -72,6 +80,14 @@ LOOKUP = {
 }
 
 
+def work_day(now=None):
+    """ Return the day of now (a datetime, by default the current time) and
+    whether the tasks starting that day are started: they start at
+    DAY_START_HOUR, not at midnight. """
+    now = now or datetime.now()
+    return now.date(), now.hour >= DAY_START_HOUR
+
+
 class Accuracy(Enum):
     """ GTG.core.dates.Date supported accuracies
 
@@ -89,17 +105,52 @@ class Accuracy(Enum):
     timezone = 'timezone'
 
 
-# ISO 8601 date format
-# get date format from locale
-DATE_FORMATS = [(locale.nl_langinfo(locale.D_T_FMT), Accuracy.datetime),
-                ('%Y-%m-%dT%H:%M%S.%f%z', Accuracy.timezone),
-                ('%Y-%m-%d %H:%M%S.%f%z', Accuracy.timezone),
-                ('%Y-%m-%dT%H:%M%S.%f', Accuracy.datetime),
-                ('%Y-%m-%d %H:%M%S.%f', Accuracy.datetime),
-                ('%Y-%m-%dT%H:%M%S', Accuracy.datetime),
-                ('%Y-%m-%d %H:%M%S', Accuracy.datetime),
-                (locale.nl_langinfo(locale.D_FMT), Accuracy.date),
-                ('%Y-%m-%d', Accuracy.date)]
+# Number of parsed strings kept, see Date.parse()
+PARSE_CACHE_SIZE = 256
+
+
+def _current_locale():
+    """ Return the name of the current locale, which the formats and the
+    translations depend on """
+    return locale.setlocale(locale.LC_ALL)
+
+
+@lru_cache(maxsize=4)
+def _date_formats(locale_name):
+    """ Return the formats of dates with the accuracy they give: the
+    formats of the locale and the ISO 8601 ones """
+    return [(locale.nl_langinfo(locale.D_T_FMT), Accuracy.datetime),
+            ('%Y-%m-%dT%H:%M%S.%f%z', Accuracy.timezone),
+            ('%Y-%m-%d %H:%M%S.%f%z', Accuracy.timezone),
+            ('%Y-%m-%dT%H:%M%S.%f', Accuracy.datetime),
+            ('%Y-%m-%d %H:%M%S.%f', Accuracy.datetime),
+            ('%Y-%m-%dT%H:%M%S', Accuracy.datetime),
+            ('%Y-%m-%d %H:%M%S', Accuracy.datetime),
+            (locale.nl_langinfo(locale.D_FMT), Accuracy.date),
+            ('%Y-%m-%d', Accuracy.date)]
+
+
+@lru_cache(maxsize=8)
+def _locale_date_format(locale_name, with_year=True):
+    """ Return the format of dates of the locale, with or without year """
+    locale_format = locale.nl_langinfo(locale.D_FMT)
+    if not with_year:
+        locale_format = locale_format.replace('/%Y', '')
+        locale_format = locale_format.replace('.%Y', '.')
+    return locale_format
+
+
+@lru_cache(maxsize=4)
+def _now_strings(locale_name):
+    """ Return the strings meaning the current time """
+    return frozenset({'now', _('now').lower()})
+
+
+@lru_cache(maxsize=1)
+def _parse_cache(day, locale_name):
+    """ Return the dates parsed from strings on day in the locale, as
+    the strings like 'tomorrow' mean another date the next day """
+    return OrderedDict()
 
 
 class Date:
@@ -114,10 +165,13 @@ class Date:
       - a string containing a locale format date.
     """
 
-    __slots__ = ['dt_value']
+    __slots__ = ['dt_value', '_ordinal']
 
     def __init__(self, value=None):
         self.dt_value = None
+        # Ordinal of the day for dates accurate to the day (see
+        # date.toordinal()), used to compare them with integer operations
+        self._ordinal = None
         if isinstance(value, (date, datetime)):
             self.dt_value = value
         elif isinstance(value, Date):
@@ -133,6 +187,9 @@ class Date:
             self.dt_value = LOOKUP[value]
         if self.dt_value is None:
             raise ValueError(f"Unknown value for date: '{value}'")
+        if isinstance(self.dt_value, date) and \
+                not isinstance(self.dt_value, datetime):
+            self._ordinal = self.dt_value.toordinal()
 
     @staticmethod
     def __parse_dt_str(string):
@@ -143,7 +200,13 @@ class Date:
             except (ValueError,  # ignoring no iso format value
                     AttributeError):  # ignoring python < 3.7
                 pass
-        for date_format, accuracy in DATE_FORMATS:
+        if string in _now_strings(_current_locale()):
+            return datetime.now()
+        # fuzzy dates are not dates in any format
+        fuzzy = LOOKUP.get(string.lower(), None)
+        if fuzzy is not None:
+            return fuzzy
+        for date_format, accuracy in _date_formats(_current_locale()):
             try:
                 dt_value = datetime.strptime(string, date_format)
                 if accuracy is Accuracy.date:
@@ -151,9 +214,7 @@ class Date:
                 return dt_value
             except ValueError:
                 pass
-        if string in {'now', _('now').lower()}:
-            return datetime.now()
-        return LOOKUP.get(str(string).lower(), None)
+        return None
 
     @property
     def accuracy(self):
@@ -199,8 +260,7 @@ class Date:
             return self.dt_value
         if self.accuracy is Accuracy.fuzzy:
             now = datetime.now()
-            delta_days = {SOON: 15, SOMEDAY: 365, NODATE: 9999}
-            gtg_date = Date(now + timedelta(delta_days[self.dt_value]))
+            gtg_date = Date(now + timedelta(FUZZY_DAYS[self.dt_value]))
             if gtg_date.accuracy is wanted_accuracy:
                 return gtg_date.dt_value
             return self._dt_by_accuracy(gtg_date.dt_value, gtg_date.accuracy,
@@ -228,6 +288,38 @@ class Date:
         return (self.dt_by_accuracy(Accuracy.fuzzy),
                 other.dt_by_accuracy(Accuracy.fuzzy))
 
+    def _day_ordinal(self):
+        """Return the ordinal of the day of a date accurate to the day or of
+        a fuzzy date (but now), or None for the other dates"""
+        if self._ordinal is not None:
+            return self._ordinal
+        if self.dt_value in FUZZY_DAYS:
+            return date.today().toordinal() + FUZZY_DAYS[self.dt_value]
+        return None
+
+    def _cast_for_comparison(self, other):
+        """Like _cast_for_operation(), but compares the ordinals of the days
+        when both dates are accurate to the day or fuzzy, which gives the
+        same result."""
+        if isinstance(other, Date):
+            ordinal = self._day_ordinal()
+            if ordinal is not None:
+                other_ordinal = other._day_ordinal()
+                if other_ordinal is not None:
+                    return ordinal, other_ordinal
+        return self._cast_for_operation(other)
+
+    def sort_key(self):
+        """Return an integer ordering the dates by day: the ordinal of the
+        day, the fuzzy dates being as many days away from today as when they
+        are compared to real dates."""
+        ordinal = self._day_ordinal()
+        if ordinal is not None:
+            return ordinal
+        if self.dt_value == NOW:
+            return date.today().toordinal()
+        return self.dt_value.date().toordinal()
+
     def __add__(self, other):
         a, b = self._cast_for_operation(other, is_comparison=False)
         return a + b
@@ -240,26 +332,26 @@ class Date:
     __rsub__ = __sub__
 
     def __lt__(self, other):
-        a, b = self._cast_for_operation(other)
+        a, b = self._cast_for_comparison(other)
         return a < b
 
     def __le__(self, other):
-        a, b = self._cast_for_operation(other)
+        a, b = self._cast_for_comparison(other)
         return a <= b
 
     def __eq__(self, other):
-        a, b = self._cast_for_operation(other)
+        a, b = self._cast_for_comparison(other)
         return a == b
 
     def __ne__(self, other):
         return not self.__eq__(other)
 
     def __gt__(self, other):
-        a, b = self._cast_for_operation(other)
+        a, b = self._cast_for_comparison(other)
         return a > b
 
     def __ge__(self, other):
-        a, b = self._cast_for_operation(other)
+        a, b = self._cast_for_comparison(other)
         return a >= b
 
     def __str__(self):
@@ -281,7 +373,7 @@ class Date:
             now = datetime.now()
             if now - span <= self.dt_value < now + span:
                 return _('now')
-        return self.date().strftime(locale.nl_langinfo(locale.D_FMT))
+        return self.date().strftime(_locale_date_format(_current_locale()))
 
     def __repr__(self):
         return f"<Date({self})>"
@@ -442,6 +534,35 @@ class Date:
         else:
             string = string.lower()
 
+        result = cls._cached_parse((cls, string), cls._parse_string, string)
+        if result is None:
+            raise ValueError(f"Can't parse date '{string}'")
+        return result
+
+    @staticmethod
+    def _cached_parse(key, parse, *args):
+        """ Return parse(*args), kept for the day under key
+
+        Strings meaning the current time ('now') are never kept.
+        """
+        locale_name = _current_locale()
+        if args[0] in _now_strings(locale_name):
+            return parse(*args)
+
+        cache = _parse_cache(date.today(), locale_name)
+        try:
+            cache.move_to_end(key)
+            return cache[key]
+        except KeyError:
+            pass
+        result = cache[key] = parse(*args)
+        if len(cache) > PARSE_CACHE_SIZE:
+            cache.popitem(last=False)
+        return result
+
+    @classmethod
+    def _parse_string(cls, string):
+        """ Return the Date of a lowercase string for parse(), or None """
         # try the default formats
         try:
             return cls(string)
@@ -458,8 +579,7 @@ class Date:
         # Announce the result
         if result is not None:
             return cls(result)
-        else:
-            raise ValueError(f"Can't parse date '{string}'")
+        return None
 
     def _parse_only_month_day_for_recurrency(self, string, newtask=True):
         """ Parse next Xth day in month from a certain date"""
@@ -572,6 +692,16 @@ class Date:
         else:
             string = string.lower()
 
+        key = ('from_date', self.sort_key(), newtask, string)
+        result = self._cached_parse(key, self._parse_string_from_date,
+                                    string, newtask)
+        if result is None:
+            raise ValueError(f"Can't parse date '{string}'")
+        return result
+
+    def _parse_string_from_date(self, string, newtask):
+        """ Return the Date of a lowercase string for parse_from_date(),
+        or None """
         try:
             return Date(string)
         except ValueError:
@@ -585,8 +715,7 @@ class Date:
 
         if result is not None:
             return Date(result)
-        else:
-            raise ValueError(f"Can't parse date '{string}'")
+        return None
 
     def to_readable_string(self):
         """ Return nice representation of date.
@@ -609,15 +738,13 @@ class Date:
             return ngettext('Tomorrow', 'In %(days)d days', days_left) % \
                 {'days': days_left}
         else:
-            locale_format = locale.nl_langinfo(locale.D_FMT)
             if calendar.isleap(date.today().year):
                 year_len = 366
             else:
                 year_len = 365
-            if float(days_left) / year_len < 1.0:
-                # if it's in less than a year, don't show the year field
-                locale_format = locale_format.replace('/%Y', '')
-                locale_format = locale_format.replace('.%Y', '.')
+            # if it's in less than a year, don't show the year field
+            with_year = float(days_left) / year_len >= 1.0
+            locale_format = _locale_date_format(_current_locale(), with_year)
             return self.dt_by_accuracy(Accuracy.date).strftime(locale_format)
 
 
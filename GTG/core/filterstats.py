@@ -0,0 +1,147 @@
+# -----------------------------------------------------------------------------
+# Getting Things GNOME! - a personal organizer for the GNOME desktop
+# Copyright (c) 2008-2013 - Lionel Dricot & Bertrand Rousseau
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+
+"""
+Statistics about the filters of the trees: how many times they are called and
+how long they take, to find the filters which slow down the refresh of the
+views.
+"""
+
+import functools
+import json
+import os
+import time
+from collections import deque
+
+# Setting this environment variable before starting GTG enables the statistics
+ENV_VARIABLE = 'GTG_FILTER_STATS'
+
+# Number of the last durations kept for each filter to compute percentiles
+MAX_SAMPLES = 10000
+
+
+class _Counters():
+    """ Calls of one filter """
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.durations = deque(maxlen=MAX_SAMPLES)
+
+    def reset(self):
+        self.calls = 0
+        self.total = 0.0
+        self.durations.clear()
+
+
+def _percentile(durations, share):
+    """ Return the duration below which share of the sorted durations are """
+    index = min(len(durations) - 1, int(share * len(durations)))
+    return durations[index]
+
+
+class FilterStats():
+    """
+    Call counts and durations of the filters, by filter name.
+
+    Only the filters registered through wrap() while the statistics are
+    enabled are measured: otherwise wrap() returns the filter itself, so that
+    nothing is paid when the statistics are not wanted.
+    """
+
+    def __init__(self, enabled=None):
+        """
+        @param enabled: measure the filters, by default if the environment
+                        variable GTG_FILTER_STATS is set
+        """
+        if enabled is None:
+            enabled = bool(os.environ.get(ENV_VARIABLE))
+        self.enabled = enabled
+        self._counters = {}
+
+    def wrap(self, name, func):
+        """ Return func measuring its calls under name, if enabled """
+        if not self.enabled:
+            return func
+
+        counters = self._counters.setdefault(name, _Counters())
+        clock = time.perf_counter
+
+        @functools.wraps(func)
+        def measured(*args, **kwargs):
+            start = clock()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                duration = clock() - start
+                counters.calls += 1
+                counters.total += duration
+                counters.durations.append(duration)
+
+        return measured
+
+    def reset(self):
+        """ Forget the calls measured until now """
+        # the counters are kept by the wrapped filters, so they are reset
+        # rather than replaced
+        for counters in self._counters.values():
+            counters.reset()
+
+    def get_stats(self):
+        """
+        Return the statistics of the filters called at least once, the most
+        time consuming first
+
+        @return list of dictionaries with the keys name, calls, and total,
+                mean, p50 and p99 times in seconds
+        """
+        stats = []
+        for name, counters in self._counters.items():
+            if not counters.calls:
+                continue
+            durations = sorted(counters.durations)
+            stats.append({
+                'name': name,
+                'calls': counters.calls,
+                'total': counters.total,
+                'mean': counters.total / counters.calls,
+                'p50': _percentile(durations, 0.5),
+                'p99': _percentile(durations, 0.99),
+            })
+        stats.sort(key=lambda filter_stats: filter_stats['total'],
+                   reverse=True)
+        return stats
+
+    def dump(self, path):
+        """ Write the statistics to the file path as JSON """
+        with open(path, 'w') as stats_file:
+            json.dump(self.get_stats(), stats_file, indent=2)
+
+    def report(self):
+        """ Return the statistics as a table, times in milliseconds """
+        lines = [f"{'filter':<30} {'calls':>9} {'total':>10} "
+                 f"{'p50':>8} {'p99':>8}"]
+        for stats in self.get_stats():
+            lines.append(f"{stats['name']:<30} {stats['calls']:>9} "
+                         f"{stats['total'] * 1000:>10.1f} "
+                         f"{stats['p50'] * 1000:>8.3f} "
+                         f"{stats['p99'] * 1000:>8.3f}")
+        if not self.enabled:
+            lines.append(f"Filters are measured only if {ENV_VARIABLE} is "
+                         f"set when GTG starts")
+        return '\n'.join(lines)
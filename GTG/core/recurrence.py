@@ -0,0 +1,237 @@
+# -----------------------------------------------------------------------------
+# Getting Things GNOME! - a personal organizer for the GNOME desktop
+# Copyright (c) 2008-2013 - Lionel Dricot & Bertrand Rousseau
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+
+""" Recurrence rules of repeating tasks.
+
+A recurring term (as stored in Task.recurring_term) is compiled once by
+compile_recurring_term() into a RecurrenceRule. The rule computes the next
+occurrence after any date directly, without stepping through the
+intermediate occurrences.
+
+Supported terms are:
+  - 'day', 'other-day', 'week', 'month', 'year' (and their translations)
+  - a week day name, like 'monday' (in English or the system locale)
+  - a day of the month, like '15'
+  - a day of the year as MMDD, like '0315'
+  - a fixed date, in any format accepted by Date() or as YYYYMMDD
+"""
+
+import calendar
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from gettext import gettext as _
+
+from GTG.core.dates import Date
+
+__all__ = ['RecurrenceRule', 'compile_recurring_term']
+
+ONE_DAY = timedelta(days=1)
+
+
+def _add_months(day, months):
+    """ Move a date by a number of months, clamping the day of the month """
+    years, month = divmod(day.month - 1 + months, 12)
+    year = day.year + years
+    month += 1
+    last_day = calendar.monthrange(year, month)[1]
+    return date(year, month, min(day.day, last_day))
+
+
+class RecurrenceRule:
+    """ A compiled recurring term.
+
+    kind is one of:
+      - INTERVAL_DAYS: every <value> days
+      - INTERVAL_MONTHS: every <value> months
+      - WEEKDAY: every week on weekday <value> (0 is Monday)
+      - MONTH_DAY: every month on day <value>
+      - YEAR_DAY: every year on <value>, a (month, day) tuple
+      - FIXED: always the date <value>
+    """
+
+    INTERVAL_DAYS = 'days'
+    INTERVAL_MONTHS = 'months'
+    WEEKDAY = 'weekday'
+    MONTH_DAY = 'month_day'
+    YEAR_DAY = 'year_day'
+    FIXED = 'fixed'
+
+    __slots__ = ['kind', 'value']
+
+    def __init__(self, kind, value):
+        self.kind = kind
+        self.value = value
+
+    def first_occurrence(self, start):
+        """ Return the occurrence to use as the due date of a task which is
+        set to recur from the date start """
+        if self.kind in (self.INTERVAL_DAYS, self.INTERVAL_MONTHS):
+            return start
+        if self.kind == self.YEAR_DAY:
+            return self._next_matching(start)
+        return self.next_occurrence(start)
+
+    def next_occurrence(self, after, not_before=None):
+        """ Return the first occurrence strictly after the date after.
+
+        If not_before is given, the first occurrence on or after not_before
+        is returned instead when it comes later. Intervals are counted
+        from after.
+        """
+        if self.kind == self.FIXED:
+            return self.value
+
+        if self.kind == self.INTERVAL_DAYS:
+            steps = 1
+            if not_before is not None and not_before > after:
+                days = (not_before - after).days
+                steps = max(1, -(-days // self.value))
+            return after + timedelta(days=steps * self.value)
+
+        if self.kind == self.INTERVAL_MONTHS:
+            steps = 1
+            if not_before is not None and not_before > after:
+                months = (not_before.year - after.year) * 12 + \
+                    not_before.month - after.month
+                steps = max(1, months // self.value)
+            result = _add_months(after, steps * self.value)
+            while not_before is not None and result < not_before:
+                steps += 1
+                result = _add_months(after, steps * self.value)
+            return result
+
+        start = after + ONE_DAY
+        if not_before is not None and not_before > start:
+            start = not_before
+        return self._next_matching(start)
+
+    def _next_matching(self, start):
+        """ Return the first day on or after start matching the rule """
+        if self.kind == self.WEEKDAY:
+            return start + timedelta(days=(self.value - start.weekday()) % 7)
+
+        if self.kind == self.MONTH_DAY:
+            year, month = start.year, start.month
+            if start.day > self.value:
+                year, month = year + month // 12, month % 12 + 1
+            # skip months which don't have that day
+            while calendar.monthrange(year, month)[1] < self.value:
+                year, month = year + month // 12, month % 12 + 1
+            return date(year, month, self.value)
+
+        if self.kind == self.YEAR_DAY:
+            month, day = self.value
+            year = start.year
+            while True:
+                try:
+                    result = date(year, month, day)
+                except ValueError:
+                    # February 29th on a non-leap year
+                    result = None
+                if result is not None and result >= start:
+                    return result
+                year += 1
+
+        raise ValueError(f"Unknown recurrence kind {self.kind}")
+
+    def __eq__(self, other):
+        return isinstance(other, RecurrenceRule) and \
+            (self.kind, self.value) == (other.kind, other.value)
+
+    def __hash__(self):
+        return hash((self.kind, self.value))
+
+    def __repr__(self):
+        return f"<RecurrenceRule({self.kind}, {self.value!r})>"
+
+
+def _text_terms():
+    """ Map the textual recurring terms to their rule """
+    terms = {}
+    for english, local, kind, value in (
+            # Translators: Used in recurring parsing, made lowercased in code
+            ('day', _('day'), RecurrenceRule.INTERVAL_DAYS, 1),
+            # Translators: Used in recurring parsing, made lowercased in code
+            ('other-day', _('other-day'), RecurrenceRule.INTERVAL_DAYS, 2),
+            # Translators: Used in recurring parsing, made lowercased in code
+            ('week', _('week'), RecurrenceRule.INTERVAL_DAYS, 7),
+            # Translators: Used in recurring parsing, made lowercased in code
+            ('month', _('month'), RecurrenceRule.INTERVAL_MONTHS, 1),
+            # Translators: Used in recurring parsing, made lowercased in code
+            ('year', _('year'), RecurrenceRule.INTERVAL_MONTHS, 12),
+    ):
+        terms[english] = terms[local.lower()] = RecurrenceRule(kind, value)
+
+    for i, (english, local) in enumerate([
+        ("Monday", _("Monday")),
+        ("Tuesday", _("Tuesday")),
+        ("Wednesday", _("Wednesday")),
+        ("Thursday", _("Thursday")),
+        ("Friday", _("Friday")),
+        ("Saturday", _("Saturday")),
+        ("Sunday", _("Sunday")),
+    ]):
+        rule = RecurrenceRule(RecurrenceRule.WEEKDAY, i)
+        terms[english.lower()] = terms[local.lower()] = rule
+    return terms
+
+
+@lru_cache(maxsize=None)
+def compile_recurring_term(term):
+    """ Compile a recurring term into a RecurrenceRule.
+
+    Raises ValueError if the term is not valid.
+    """
+    if term is None:
+        raise ValueError("No recurring term")
+    term = term.lower()
+
+    # a plain date
+    try:
+        return RecurrenceRule(RecurrenceRule.FIXED, Date(term))
+    except ValueError:
+        pass
+
+    # a day of the month
+    try:
+        mday = int(term)
+    except ValueError:
+        pass
+    else:
+        if 1 <= mday <= 31 and not term.startswith('0'):
+            return RecurrenceRule(RecurrenceRule.MONTH_DAY, mday)
+
+    # a day of the year or a date without separators
+    try:
+        # parse within a leap year to accept February 29th
+        parsed = datetime.strptime(f'{term}/2000', '%m%d/%Y')
+        return RecurrenceRule(RecurrenceRule.YEAR_DAY,
+                              (parsed.month, parsed.day))
+    except ValueError:
+        pass
+    for fmt in ['%Y/%m/%d', '%Y%m%d']:
+        try:
+            parsed = datetime.strptime(term, fmt).date()
+            return RecurrenceRule(RecurrenceRule.FIXED, Date(parsed))
+        except ValueError:
+            pass
+
+    try:
+        return _text_terms()[term]
+    except KeyError:
+        raise ValueError(f"Invalid recurring term '{term}'")
@@ -23,6 +23,7 @@ import logging
 from gi.repository import GObject
 
 from GTG.core.tag import Tag, SEARCH_TAG_PREFIX
+from GTG.core.task import Task
 
 log = logging.getLogger(__name__)
 
@@ -36,7 +37,9 @@ class Requester(GObject.GObject):
     Multiple L{Requester}s can exist on the same datastore, so they should
     never have state of their own.
     """
-    __gsignals__ = {'status-changed': (GObject.SignalFlags.RUN_FIRST, None, (str, str,))}
+    __gsignals__ = {'status-changed': (GObject.SignalFlags.RUN_FIRST, None, (str, str,)),
+                    # the look of the tag changed, tasks need to be redrawn
+                    'tag-style-changed': (GObject.SignalFlags.RUN_FIRST, None, (str,))}
 
     def __init__(self, datastore, global_conf):
         """Construct a L{Requester}."""
@@ -83,10 +86,15 @@ class Requester(GObject.GObject):
     def list_filters(self):
         return self.__basetree.list_filters()
 
+    def get_filter_stats(self):
+        """Return the GTG.core.filterstats.FilterStats of the filters."""
+        return self.ds.filter_stats
+
     # Add a filter to the filter bank
     # Return True if the filter was added
     # Return False if the filter_name was already in the bank
     def add_filter(self, filter_name, filter_func):
+        filter_func = self.ds.filter_stats.wrap(filter_name, filter_func)
         return self.__basetree.add_filter(filter_name, filter_func)
 
     # Remove a filter from the bank.
@@ -144,21 +152,51 @@ class Requester(GObject.GObject):
         log.debug("deleting task %s", tid)
         return self.__basetree.del_node(tid, recursive=recursive)
 
+    def batch(self):
+        """Group modifications of many tasks.
+
+        Used as a context manager, every task synced inside the block is
+        refreshed once when the block ends:
+
+            with req.batch():
+                for task in tasks:
+                    task.set_status(Task.STA_DONE)
+        """
+        return self.ds.batch()
+
+    def refresh_task(self, tid):
+        """Filter task tid again in the views, once per batch"""
+        self.ds.refresh_task(tid)
+
+    def flush_syncs(self):
+        """Notify the views of every pending task modification right away"""
+        self.ds.flush_deferred_syncs()
+
     def get_task_id(self, task_title):
         """ Heuristic which convert task_title to a task_id
 
         Return a first task which has similar title """
 
-        task_title = task_title.lower()
-        tasks = self.get_tasks_tree('active', False).get_all_nodes()
-        tasktree = self.get_main_view()
-        for task_id in tasks:
-            task = tasktree.get_node(task_id)
-            if task_title == task.get_title().lower():
+        for task_id in self.ds.get_tasks_titled(task_title):
+            if self.get_task(task_id).get_status() == Task.STA_ACTIVE:
                 return task_id
 
         return None
 
+    def find_tasks(self, text, limit=10):
+        """ Return the ids of the tasks whose title and tags best match
+        text, best first. Small typos are tolerated. """
+        return self.ds.find_tasks(text, limit)
+
+    def get_tasks_changed_by_day(self):
+        """ Return the ids of the tasks whose filters may have changed
+        because the day changed since the previous call """
+        return self.ds.get_tasks_changed_by_day()
+
+    def refresh_task_views(self, tids):
+        """ Filter the tasks again in the views, without saving them """
+        self.ds.refresh_task_views(tids)
+
     # Tags ##########################
     def get_tag_tree(self):
         return self.ds.get_tagstore().get_viewtree(name='activetags')
@@ -209,6 +247,30 @@ class Requester(GObject.GObject):
 
         return SEARCH_TAG_PREFIX + name
 
+    def get_search_parameters(self, query):
+        """
+        Parse a search query into the parameters of the search filter.
+
+        @param query: Query will be parsed using search parser
+        @return:      parameters to apply the SEARCH_TAG filter with
+        @raise InvalidQuery: the query is not valid
+        """
+        return self.ds.get_search_parameters(query)
+
+    def get_task_saved_searches(self, tid):
+        """Return the names of the saved searches matching a task."""
+        return self.ds.get_task_saved_searches(tid)
+
+    def search_closed_tasks(self, parameters, page_size=100):
+        """
+        Search the closed tasks a page at a time, the most recently closed
+        first.
+
+        @param parameters: parameters from get_search_parameters()
+        @return: a GTG.core.search.PagedSearch
+        """
+        return self.ds.search_closed_tasks(parameters, page_size)
+
     def remove_tag(self, name):
         """ calls datastore to remove a given tag """
         self.ds.remove_tag(name)
@@ -216,9 +278,17 @@ class Requester(GObject.GObject):
     def rename_tag(self, oldname, newname):
         self.ds.rename_tag(oldname, newname)
 
+    def merge_tags(self, oldname, newname):
+        """Move the tasks of the tag 'oldname' to 'newname' and remove it"""
+        self.ds.merge_tags(oldname, newname)
+
     def get_tag(self, tagname):
         return self.ds.get_tag(tagname)
 
+    def get_tag_closure(self, tagname):
+        """Return the set of the tag 'tagname' and all its descendants."""
+        return self.ds.get_tag_closure(tagname)
+
     def get_used_tags(self):
         """Return tags currently used by a task.
 
@@ -238,10 +308,11 @@ class Requester(GObject.GObject):
 
     def delete_tag(self, tagname):
         my_tag = self.get_tag(tagname)
-        for task_id in my_tag.get_related_tasks():
-            my_task = self.get_task(task_id)
-            my_task.remove_tag(tagname)
-            my_task.sync()
+        with self.ds.batch():
+            for task_id in my_tag.get_related_tasks():
+                my_task = self.get_task(task_id)
+                my_task.remove_tag(tagname)
+                my_task.sync()
 
     # Backends #######################
     def get_all_backends(self, disabled=False):
@@ -41,6 +41,8 @@ The query language consists of several elements:
     - !soon -- show tasks with due_date == soon
     - !someday -- show tasks with due_date == someday
     - !notag -- show tasks without tags
+    - !fuzzy <elem> -- show tasks whose title and tags look like this element,
+        even with typos
   - tags -- show tasks with this tag
   - word -- show tasks which contains this word
   - "literal" -- basically the same as word but allows the space and special
@@ -57,6 +59,7 @@ Examples of queries:
 'buy @errands' => show errands where I have to buy something
 '!not buy @errands' => show errands without keyword buy
 '!after "next month"' => show tasks after this month
+'!fuzzy "yearly reprot"' => show the task "Write the yearly report"
 
 
 search_filter() expect parameter 'q' which is a list of commands in the form
@@ -68,7 +71,18 @@ A special command is "or" which contains subcommands and returns Ture if
 at least one subcommand returns True.
 
 search_filter() could be easily plugged in Liblarch and filter only suitable
-tasks.
+tasks. On its first call with some parameters, it compiles the commands with
+compile_search_query() into a single predicate and keeps it in the parameters
+under the key 'predicate', so that the commands are not interpreted again for
+every task. If the parameters also have a 'text_index', words are looked up
+in it (see GTG.core.textindex). !fuzzy needs a 'fuzzy_index' in the
+parameters; without it, its words are searched like other words.
+
+While typing, SearchCache keeps the parameters of the last queries. Their
+'results' remember the result for each task as long as it is unchanged, and
+a query which only narrows a previous one (a longer word, one more command)
+gets its results under 'narrows': tasks which didn't match the previous
+query are rejected without being checked.
 
 For more information see unittests:
   - GTG/tests/test_search_query.py -- parsing query
@@ -76,10 +90,15 @@ For more information see unittests:
 """
 
 import re
+from collections import OrderedDict
+from datetime import date, timedelta
+from functools import lru_cache
 
 from gettext import gettext as _
 from GTG.core.dates import Date
 
+ONE_DAY = timedelta(days=1)
+
 # Generate keywords and their possible translations
 # They must be listed because of gettext
 KEYWORDS = {
@@ -105,6 +124,8 @@ KEYWORDS = {
     "someday": _("someday"),
     # Translators: Used in search parsing, no spaces, lowercased in code
     "notag": _("notag"),
+    # Translators: Used in search parsing, no spaces, lowercased in code
+    "fuzzy": _("fuzzy"),
 }
 
 # transform keywords and their translations into a list of possible commands
@@ -155,6 +176,25 @@ def _tokenize_query(query):
             pos, len(query), query[pos:pos + 10]))
 
 
+def split_words(text):
+    """ Split text into lower-cased words the way a query is tokenized
+
+    Unlike _tokenize_query(), any text is accepted: the characters which
+    can't be tokenized are skipped. The leading '!' of commands and '@' of
+    tags are removed, and literals give their words.
+    """
+    words = []
+    for match in TOKENS_RE.finditer(text):
+        token_type = match.lastgroup
+        if token_type == 'space':
+            continue
+        value = match.group(token_type)
+        if token_type in ('command', 'tag'):
+            value = value[1:]
+        words.extend(value.strip('"').lower().split())
+    return words
+
+
 def parse_search_query(query):
     """ Parse query into parameters for search filter
 
@@ -171,10 +211,18 @@ def parse_search_query(query):
 
     not_count, after_or = 0, False
     require_date = None
+    require_text = False
     for token, value in _tokenize_query(query):
         cmd = None
 
-        if require_date:
+        if require_text:
+            if token not in ['word', 'literal', 'tag', 'date']:
+                raise InvalidQuery(f"Unexpected token '{token}' after 'fuzzy'")
+
+            cmd = ('fuzzy', not_count % 2 == 0, value.strip('"'))
+            require_text = False
+
+        elif require_date:
             if token not in ['date', 'word', 'literal']:
                 raise InvalidQuery(f"Unexpected token '{token}' after '{require_date}'")
 
@@ -211,6 +259,8 @@ def parse_search_query(query):
                     after_or = True
                 elif keyword in ['after', 'before']:
                     require_date = keyword
+                elif keyword == 'fuzzy':
+                    require_text = True
                 else:
                     cmd = (keyword, not_count % 2 == 0)
                 found = True
@@ -240,59 +290,301 @@ def parse_search_query(query):
     if require_date:
         raise InvalidQuery(f"Required date after '{require_date}'")
 
+    if require_text:
+        raise InvalidQuery("Required text after 'fuzzy'")
+
     return {'q': commands}
 
 
+@lru_cache(maxsize=1)
+def _relative_dates(day):
+    """ Return the Date of today and tomorrow, computed once per day """
+    today = Date(day)
+    return today, Date(day + ONE_DAY)
+
+
+def _today():
+    return _relative_dates(date.today())[0]
+
+
+def _tomorrow():
+    return _relative_dates(date.today())[1]
+
+
+def _compile_due_date(get_date):
+    """ Check that the due date is the one returned by get_date() """
+    return lambda task: task.get_due_date() == get_date()
+
+
+def _compile_fixed_due_date(value):
+    """ Check that the due date is value """
+    return lambda task: task.get_due_date() == value
+
+
+def _compile_word(word, text_index=None):
+    """ Check that the task contains the word
+
+    With a text index, only the tasks which may contain the word are
+    checked. """
+    word = word.lower()
+
+    def check(task):
+        return word in task.get_search_text() or \
+            word in task.get_title().lower()
+
+    if text_index is None:
+        return check
+
+    def check_candidates(task):
+        candidates = text_index.get_candidates(word)
+        if candidates is not None and task.get_id() not in candidates:
+            return False
+        return check(task)
+    return check_candidates
+
+
+def _compile_fuzzy(text, text_index=None, fuzzy_index=None):
+    """ Check that the title and the tags of the task look like text
+
+    Without a fuzzy index, the words of text are searched like any word. """
+    if fuzzy_index is None:
+        checks = [_compile_word(word, text_index)
+                  for word in split_words(text)]
+        return lambda task: all(check(task) for check in checks)
+
+    return lambda task: task.get_id() in fuzzy_index.get_matches(text)
+
+
+def _compile_after(value):
+    return lambda task: task.get_due_date() > value
+
+
+def _compile_before(value):
+    return lambda task: task.get_due_date() < value
+
+
+def _compile_tag(value):
+    return lambda task: value in task.get_tags_name()
+
+
+def _compile_notag(value):
+    return lambda task: task.get_tags() == []
+
+
+_COMMAND_COMPILERS = {
+    'after': _compile_after,
+    'before': _compile_before,
+    'tag': _compile_tag,
+    'today': lambda v: _compile_due_date(_today),
+    'tomorrow': lambda v: _compile_due_date(_tomorrow),
+    'nodate': lambda v: _compile_fixed_due_date(Date.no_date()),
+    'now': lambda v: _compile_due_date(_today),
+    'soon': lambda v: _compile_fixed_due_date(Date.soon()),
+    'someday': lambda v: _compile_fixed_due_date(Date.someday()),
+    'notag': _compile_notag,
+}
+
+
+def _compile_command(command, text_index=None, fuzzy_index=None):
+    """ Compile one command into a function checking a task """
+    cmd, positive, args = command[0], command[1], command[2:]
+
+    if cmd == 'or':
+        sub_checks = [_compile_command(sub_cmd, text_index, fuzzy_index)
+                      for sub_cmd in args[0]]
+
+        def check(task):
+            for sub_check in sub_checks:
+                if sub_check(task):
+                    return True
+            return False
+    elif cmd == 'word':
+        check = _compile_word(args[0], text_index)
+    elif cmd == 'fuzzy':
+        check = _compile_fuzzy(args[0], text_index, fuzzy_index)
+    elif cmd in _COMMAND_COMPILERS:
+        check = _COMMAND_COMPILERS[cmd](args[0] if args else None)
+    else:
+        def check(task):
+            return False
+
+    if positive:
+        return check
+    return lambda task: not check(task)
+
+
+def compile_search_query(commands, text_index=None, fuzzy_index=None):
+    """ Compile the commands returned by parse_search_query() (under 'q')
+    into a function which returns whether a task satisfies all of them
+
+    text_index is a GTG.core.textindex.TextIndex of the searched tasks. The
+    words are checked first, since the index rejects most tasks at once.
+    fuzzy_index is a GTG.core.textindex.FuzzyIndex used by !fuzzy.
+    """
+    commands = sorted(commands, key=lambda command: command[0] != 'word')
+    checks = [_compile_command(command, text_index, fuzzy_index)
+              for command in commands]
+
+    def predicate(task):
+        for check in checks:
+            if not check(task):
+                return False
+        return True
+    return predicate
+
+
 def search_filter(task, parameters=None):
     """ Check if task satisfies all search parameters """
 
     if parameters is None or 'q' not in parameters:
         return False
 
-    def check_commands(commands_list):
-        """ Execute search commands
-
-        This method is recursive for !or and !and """
-
-        def fulltext_search(task, word):
-            """ check if task contains the word """
-            word = word.lower()
-            text = task.get_excerpt(strip_tags=False).lower()
-            title = task.get_title().lower()
-
-            return word in text or word in title
-
-        value_checks = {
-            'after': lambda t, v: task.get_due_date() > v,
-            'before': lambda t, v: task.get_due_date() < v,
-            'tag': lambda t, v: v in task.get_tags_name(),
-            'word': fulltext_search,
-            'today': lambda task, v: task.get_due_date() == Date.today(),
-            'tomorrow': lambda task, v: task.get_due_date() == Date.tomorrow(),
-            'nodate': lambda task, v: task.get_due_date() == Date.no_date(),
-            'now': lambda task, v: task.get_due_date() == Date.now(),
-            'soon': lambda task, v: task.get_due_date() == Date.soon(),
-            'someday': lambda task, v: task.get_due_date() == Date.someday(),
-            'notag': lambda task, v: task.get_tags() == [],
-        }
-
-        for command in commands_list:
-            cmd, positive, args = command[0], command[1], command[2:]
-            result = False
-
-            if cmd == 'or':
-                for sub_cmd in args[0]:
-                    if check_commands([sub_cmd]):
-                        result = True
-                        break
-            elif value_checks.get(cmd, None):
-                if len(args) > 0:
-                    args = args[0]
-                result = value_checks[cmd](task, args)
-
-            if (positive and not result) or (not positive and result):
-                return False
+    try:
+        predicate = parameters['predicate']
+    except KeyError:
+        predicate = compile_search_query(parameters['q'],
+                                         parameters.get('text_index'),
+                                         parameters.get('fuzzy_index'))
+        parameters['predicate'] = predicate
+
+    results = parameters.get('results')
+    if results is None:
+        return predicate(task)
+
+    tid = task.get_id()
+    stamp = (task.get_modified(), task.get_content_version())
+    known = results.get(tid)
+    if known is not None and known[0] == stamp:
+        return known[1]
+
+    narrowed = parameters.get('narrows')
+    if narrowed is not None:
+        previous = narrowed.get(tid)
+        if previous is not None and previous[0] == stamp and not previous[1]:
+            results[tid] = (stamp, False)
+            return False
+
+    result = predicate(task)
+    results[tid] = (stamp, result)
+    return result
+
+
+# Commands whose result changes with the current date
+RELATIVE_DATE_COMMANDS = {'today', 'tomorrow', 'now'}
+
+
+def _has_relative_dates(commands):
+    for command in commands:
+        if command[0] == 'or':
+            if _has_relative_dates(command[2]):
+                return True
+        elif command[0] in RELATIVE_DATE_COMMANDS:
+            return True
+    return False
+
+
+def is_narrowing(old_commands, new_commands):
+    """ Return True if every task satisfying new_commands also satisfies
+    old_commands, as when more is typed at the end of a query """
+    if len(new_commands) < len(old_commands):
+        return False
 
-        return True
+    for old, new in zip(old_commands, new_commands):
+        if old == new:
+            continue
+        if old[0] == new[0] == 'word' and old[1] and new[1] and \
+                old[2] in new[2]:
+            continue
+        return False
+    return True
+
+
+class SearchCache():
+    """ Parameters of search_filter() for the last queries
+
+    The results of the tasks are kept with the parameters, so that going
+    back to a query (e.g. with backspace) only checks the changed tasks, and
+    a narrowing query only checks the tasks which matched before. Queries
+    depending on the current date are not cached.
+    """
+
+    def __init__(self, make_parameters, size=5):
+        """
+        @param make_parameters: function parsing a query into parameters,
+                                like parse_search_query()
+        @param size: number of queries to keep
+        """
+        self._make_parameters = make_parameters
+        self._size = size
+        self._entries = OrderedDict()
+        self._day = None
+
+    def get_parameters(self, query):
+        """ Return the parameters for query
+
+        Raises InvalidQuery if the query is not valid.
+        """
+        today = date.today()
+        if today != self._day:
+            self._entries.clear()
+            self._day = today
+
+        try:
+            parameters = self._entries.pop(query)
+        except KeyError:
+            parameters = self._make_parameters(query)
+            if _has_relative_dates(parameters['q']):
+                return parameters
+
+            parameters['results'] = {}
+            for previous in reversed(self._entries.values()):
+                if is_narrowing(previous['q'], parameters['q']):
+                    parameters['narrows'] = previous['results']
+                    break
+
+        self._entries[query] = parameters
+        while len(self._entries) > self._size:
+            self._entries.popitem(last=False)
+        return parameters
+
+
+class PagedSearch():
+    """ Search through a list of tasks a page at a time
+
+    Each call to next_page() checks the next tasks until a page of matching
+    tasks is found (or a bounded number of tasks were checked), so that a
+    long list can be searched from an idle handler and the search dropped
+    as soon as the query changes.
+    """
 
-    return check_commands(parameters['q'])
+    def __init__(self, task_ids, get_task, parameters, page_size=100,
+                 max_checks=1000):
+        """
+        @param task_ids: ids of the tasks to search, in the order of the
+                         results
+        @param get_task: function returning the task of an id (or None)
+        @param parameters: parameters of search_filter()
+        @param page_size: maximum number of tasks returned by next_page()
+        @param max_checks: maximum number of tasks checked by next_page()
+        """
+        self._task_ids = task_ids
+        self._get_task = get_task
+        self._parameters = parameters
+        self._page_size = page_size
+        self._max_checks = max_checks
+        self._position = 0
+
+    def is_done(self):
+        return self._position >= len(self._task_ids)
+
+    def next_page(self):
+        """ Return the ids of the next matching tasks """
+        found = []
+        end = min(self._position + self._max_checks, len(self._task_ids))
+        while self._position < end and len(found) < self._page_size:
+            tid = self._task_ids[self._position]
+            self._position += 1
+            task = self._get_task(tid)
+            if task is not None and search_filter(task, self._parameters):
+                found.append(tid)
+        return found
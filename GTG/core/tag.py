@@ -25,9 +25,9 @@ easier.  See the end of this file for the Tag object implementation.
 
 import uuid
 import xml.sax.saxutils as saxutils
-import re
 
 from liblarch import TreeNode
+from GTG.core.content import TASK_TAG_REGEX
 from functools import reduce
 
 # Tags with special meaning
@@ -38,10 +38,13 @@ SEARCH_TAG = "search"
 
 SEARCH_TAG_PREFIX = "__SAVED_SEARCH_" # For name inside the tagtree
 
+# Attributes of tags which can change the filters their tasks pass
+FILTER_ATTRIBUTES = frozenset(['parent', 'nonactionable'])
+
 def extract_tags_from_text(text):
     """ Given a string, returns a list of the @tags contained in that """
 
-    return re.findall(r'(?:^|[\s])(@[\w\/\.\-\:\&]*\w)', text)
+    return TASK_TAG_REGEX.findall(text)
 
 
 def parse_tag_list(text):
@@ -99,18 +102,12 @@ class Tag(TreeNode):
             self.tid = uuid.uuid4()
 
     def __get_viewcount(self):
-        if not self.viewcount and self.get_name() != "gtg-tags-sep":
+        """ Saved searches are counted by a liblarch viewcount with their
+        query applied. The other tags are counted by the DataStore. """
+        if not self.viewcount and self.is_search_tag():
             basetree = self.req.get_basetree()
             self.viewcount = basetree.get_viewcount(self.get_name(), False)
-
-            sp_id = self.get_attribute("special")
-            if sp_id == "all":
-                pass
-            if sp_id == "notag":
-                self.viewcount.apply_filter('notag', refresh=False)
-            # No special means a normal tag
-            else:
-                self.viewcount.apply_filter(self.get_name(), refresh=False)
+            self.viewcount.apply_filter(self.get_name(), refresh=False)
             self.viewcount.apply_filter('active')
             self.viewcount.register_cllbck(self.modified)
         return self.viewcount
@@ -127,18 +124,40 @@ class Tag(TreeNode):
     # To ensure that the task is well counted/uncounted for that tag
     def update_task(self, task_id):
         vc = self.__get_viewcount()
-        vc.modify(task_id)
+        if vc:
+            vc.modify(task_id)
+        else:
+            self.req.ds.update_task_tags(task_id)
 
     # overiding some functions to not allow dnd of special tags
     def add_parent(self, parent_id):
         p = self.req.get_tag(parent_id)
         if p and not self.is_special() and not p.is_special():
             TreeNode.add_parent(self, parent_id)
+            self._hierarchy_changed()
 
     def add_child(self, child_id):
         special_child = self.req.get_tag(child_id).is_special()
         if not self.is_special() and not special_child:
             TreeNode.add_child(self, child_id)
+            self._hierarchy_changed()
+
+    def set_parent(self, parent_id):
+        TreeNode.set_parent(self, parent_id)
+        self._hierarchy_changed()
+
+    def remove_parent(self, parent_id):
+        TreeNode.remove_parent(self, parent_id)
+        self._hierarchy_changed()
+
+    def remove_child(self, child_id):
+        TreeNode.remove_child(self, child_id)
+        self._hierarchy_changed()
+
+    def _hierarchy_changed(self):
+        """ Drop the tag closures which might be outdated """
+        if self.req:
+            self.req.ds.invalidate_tag_closure()
 
     def get_name(self):
         """Return the internal name of the tag, as saved in the tree."""
@@ -179,7 +198,24 @@ class Tag(TreeNode):
             modified = True
         if modified:
             self.modified()
-            self.notify_related_tasks()
+            self._attributes_changed([att_name])
+
+    def set_attributes(self, attributes):
+        """Set several attributes at once.
+
+        Like set_attribute(), but the C{save_cllbk} callback is called and
+        the related tasks are notified only once.
+        """
+        if not attributes:
+            return
+        for att_name, att_value in attributes.items():
+            if att_name in ('name', 'parent'):
+                raise KeyError(f"The {att_name} of tag cannot be set here")
+            self._attributes[att_name] = str(att_value)
+        if self._save:
+            self._save()
+        self.modified()
+        self._attributes_changed(attributes.keys())
 
     def get_attribute(self, att_name):
         """Get the attribute C{att_name}.
@@ -211,7 +247,7 @@ class Tag(TreeNode):
         if self._save:
             self._save()
         self.modified()
-        self.notify_related_tasks()
+        self._attributes_changed([att_name])
 
     def get_all_attributes(self, butname=False, withparent=False):
         """Return a list of all attribute names.
@@ -231,28 +267,39 @@ class Tag(TreeNode):
 
     # TASK relation ####
     def get_active_tasks_count(self):
-        count = self.__get_count()
-        return count
+        return self.__get_count(active_only=True)
 
     def get_total_tasks_count(self):
         return self.__get_count()
 
-    def __get_count(self, tasktree=None):
+    def __get_count(self, active_only=False):
         """Returns the number of all related tasks"""
         # this method purposefully doesn't rely on get_related_tasks()
-        # which does a similar job, in order to benefit from liblarch
-        # optimizations
+        # which does a similar job: counts are read from the tag index of
+        # the DataStore, which is updated as tasks change
+        if self.get_attribute("special") == "sep":
+            return 0
         vc = self.__get_viewcount()
         if vc:
             return vc.get_n_nodes()
-        else:
-            return 0
+        return self.req.ds.get_tag_task_count(self.get_name(), active_only)
 
     def get_related_tasks(self, tasktree=None):
-        """Returns all related tasks node ids"""
+        """Returns all related tasks node ids
+
+        Without tasktree, the ids come from the tag index of the datastore
+        rather than from running the filter of the tag over the tree. Saved
+        searches always use their filter.
+        """
+        sp_id = self.get_attribute("special")
+        if not tasktree and not self.is_search_tag():
+            if sp_id == "sep":
+                return []
+            # the tasks of "all tasks" are the active ones, like its filter
+            return self.req.ds.get_tag_task_ids(self.get_name(),
+                                                active_only=sp_id == "all")
         if not tasktree:
             tasktree = self.req.get_tasks_tree()
-        sp_id = self.get_attribute("special")
         if sp_id == "all":
             toreturn = tasktree.get_nodes(withfilters=['active'])
         elif sp_id == "notag":
@@ -264,11 +311,24 @@ class Tag(TreeNode):
             toreturn = tasktree.get_nodes(withfilters=[tname])
         return toreturn
 
+    def _attributes_changed(self, att_names):
+        """Refresh the related tasks after a change of attributes
+
+        Most attributes (color, icon...) only change how the tasks look, so
+        the views are just asked to redraw them. The tasks are modified only
+        when the attributes change which filters they pass.
+        """
+        if not FILTER_ATTRIBUTES.isdisjoint(att_names):
+            if 'nonactionable' in att_names and self.req is not None:
+                self.req.ds.invalidate_nonactionable_tags()
+            self.notify_related_tasks()
+        elif self.req is not None:
+            self.req.emit('tag-style-changed', self.get_name())
+
     def notify_related_tasks(self):
-        """Notify changes to all related tasks"""
-        for task_id in self.get_related_tasks():
-            my_task = self.req.get_task(task_id)
-            my_task.modified()
+        """Filter again all related tasks in the views, without syncing them
+        to the backends: their data didn't change"""
+        self.req.refresh_task_views(self.get_related_tasks())
 
     def is_special(self):
         return bool(self.get_attribute('special'))
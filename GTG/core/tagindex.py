@@ -0,0 +1,152 @@
+# -----------------------------------------------------------------------------
+# Getting Things GNOME! - a personal organizer for the GNOME desktop
+# Copyright (c) 2008-2013 - Lionel Dricot & Bertrand Rousseau
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+
+"""
+Index of the tasks of each tag, used to count them without running a filter
+over the whole task tree.
+"""
+
+from GTG.core.tag import ALLTASKS_TAG, NOTAG_TAG
+
+
+class TagIndex():
+    """
+    Keeps, for each tag name, the ids of the tasks having that tag and the
+    ids of the active ones among them.
+
+    The index is told about each task by update() and remove(), which only
+    touch the tags of that task.
+    """
+
+    def __init__(self):
+        # tag name -> set of task ids
+        self._tasks = {}
+        self._active = {}
+        # task id -> (frozenset of tag names, is active)
+        self._state = {}
+        self._all_active = set()
+        self._untagged = set()
+        self._untagged_active = set()
+
+    def update(self, tid, tags, active):
+        """
+        Records the tags and the active state of a task
+
+        @return set: names of the tags whose counts changed, including the
+                     special tags for all tasks and for tasks without tags
+        """
+        tags = frozenset(tags)
+        old_tags, old_active = self._state.get(tid, (None, None))
+        if old_tags == tags and old_active == active:
+            return set()
+        if old_tags is None:
+            old_tags = frozenset()
+            changed = {ALLTASKS_TAG, NOTAG_TAG}
+        else:
+            changed = set()
+
+        self._state[tid] = (tags, active)
+
+        for name in old_tags - tags:
+            self._tasks[name].discard(tid)
+            self._active[name].discard(tid)
+        for name in tags - old_tags:
+            self._tasks.setdefault(name, set()).add(tid)
+            self._active.setdefault(name, set())
+        changed |= old_tags ^ tags
+
+        if active != old_active:
+            # the active sets of all the tags of the task change
+            for name in tags:
+                if active:
+                    self._active[name].add(tid)
+                else:
+                    self._active[name].discard(tid)
+            changed |= tags | {ALLTASKS_TAG, NOTAG_TAG}
+        else:
+            for name in tags - old_tags:
+                if active:
+                    self._active[name].add(tid)
+
+        if bool(old_tags) != bool(tags):
+            changed.add(NOTAG_TAG)
+
+        self._set_member(self._all_active, tid, active)
+        self._set_member(self._untagged, tid, not tags)
+        self._set_member(self._untagged_active, tid, active and not tags)
+        return changed
+
+    def remove(self, tid):
+        """
+        Forgets about a task
+
+        @return set: names of the tags whose counts changed
+        """
+        if tid not in self._state:
+            return set()
+        tags, active = self._state.pop(tid)
+        for name in tags:
+            self._tasks[name].discard(tid)
+            self._active[name].discard(tid)
+        self._all_active.discard(tid)
+        self._untagged.discard(tid)
+        self._untagged_active.discard(tid)
+        return set(tags) | {ALLTASKS_TAG, NOTAG_TAG}
+
+    @staticmethod
+    def _set_member(container, tid, member):
+        if member:
+            container.add(tid)
+        else:
+            container.discard(tid)
+
+    def get_tasks(self, names, active_only=False):
+        """ Return the ids of the tasks having any of the given tags.
+        The returned set must not be modified. """
+        index = self._active if active_only else self._tasks
+        sets = [index[name] for name in names if name in index]
+        if len(sets) == 1:
+            return sets[0]
+        return set().union(*sets)
+
+    def get_all(self, active_only=False):
+        """ Return the ids of all the tasks (a set which must not be
+        modified, or a view of the keys of the index) """
+        if active_only:
+            return self._all_active
+        return self._state.keys()
+
+    def get_untagged(self, active_only=False):
+        """ Return the ids of the tasks without tags.
+        The returned set must not be modified. """
+        if active_only:
+            return self._untagged_active
+        return self._untagged
+
+    def has_task(self, tid):
+        return tid in self._state
+
+    def count(self, names, active_only=False):
+        """ Return the number of tasks having any of the given tags """
+        return len(self.get_tasks(names, active_only))
+
+    def count_all(self, active_only=False):
+        return len(self.get_all(active_only))
+
+    def count_untagged(self, active_only=False):
+        return len(self.get_untagged(active_only))
@@ -19,9 +19,9 @@
 """
 task.py contains the Task class which represents (guess what) a task
 """
+from collections import deque
 from datetime import datetime, date
 import html
-import re
 import uuid
 import logging
 import xml.sax.saxutils as saxutils
@@ -29,7 +29,9 @@ import xml.sax.saxutils as saxutils
 from gi.repository import GObject
 
 from gettext import gettext as _
+import GTG.core.content as content_spans
 from GTG.core.dates import Date
+from GTG.core.recurrence import compile_recurring_term
 from liblarch import TreeNode
 
 log = logging.getLogger(__name__)
@@ -56,6 +58,16 @@ class Task(TreeNode):
         self.remote_ids = {}
         # set to True to disable self.sync() and avoid flooding on task edit
         self.sync_disabled = False
+        # content version, bumped on every change of the content or of the
+        # tags, and the cache of forms derived from the content
+        self._content_version = 0
+        self._content_cache = {}
+        self._content_cache_version = -1
+        # Ids of the active subtasks, kept up to date as they change status
+        # or are added and removed (None until needed), and the number of
+        # subtasks they were last checked against
+        self._active_children = None
+        self._active_children_links = 0
         self.content = ""
         if Task.DEFAULT_TASK_NAME is None:
             Task.DEFAULT_TASK_NAME = _("My new task")
@@ -71,7 +83,7 @@ class Task(TreeNode):
         self.due_date = Date.no_date()
         self.start_date = Date.no_date()
         self.can_be_deleted = newtask
-        # tags
+        # tags, kept both as an ordered list and as a set for lookups
         self.tags = []
         self.req = requester
         self.__main_treeview = requester.get_main_view()
@@ -145,17 +157,53 @@ class Task(TreeNode):
     def duplicate_recursively(self):
         """
         Duplicates recursively all the task itself and its children while keeping the relationship
-        """
-        newtask = self.duplicate()
-        if self.has_child():
-            for c_tid in self.get_children():
-                child = self.req.get_task(c_tid)
-                if child.is_loaded():
-                    newtask.add_child(child.duplicate_recursively())
-
-        newtask.sync()
-        return newtask.tid
 
+        The whole new subtree is built outside of the task tree, then added
+        to it at once.
+        """
+        nextdate = self.get_next_occurrence()
+        copies = []
+        self._build_duplicate(None, nextdate, copies)
+        self.req.ds.add_new_tasks(copies)
+        return copies[0][0].tid
+
+    def _build_duplicate(self, parent_copy, due_date, copies):
+        """ Build the copy of the task and of its children, without adding
+        them to the task tree, as (copy, parent id) tuples in copies.
+
+        The copies end up as they would after duplicate() and add_child():
+        they recur with the term of the top task, are due on due_date and
+        inherit the tags of their parent.
+        """
+        copy = self.req.ds.task_factory(str(uuid.uuid4()))
+        copy.recurring = True
+        if parent_copy is None:
+            copy.recurring_term = self.recurring_term
+        else:
+            copy.recurring_term = parent_copy.recurring_term
+        copy.recurring_updated_date = datetime.now()
+        copy.due_date = Date(due_date)
+        copy.title = self.title
+        copy.content = self.content
+        copy.tags = self.tags
+        if parent_copy is None:
+            copies.append((copy, None))
+        else:
+            for tagname in parent_copy.get_tags_name():
+                copy.add_tag(tagname)
+            copies.append((copy, parent_copy.tid))
+
+        has_child = False
+        for c_tid in self.get_children():
+            child = self.req.get_task(c_tid)
+            if child.is_loaded():
+                child._build_duplicate(copy, due_date, copies)
+                has_child = True
+
+        copy.set_loaded()
+        copy.can_be_deleted = not has_child
+        log.debug("Duplicating task %s as task %s",
+                  self.get_id(), copy.get_id())
 
     def set_title(self, title):
         """Set the tasks title. Returns True if title was changed."""
@@ -233,6 +281,8 @@ class Task(TreeNode):
             if not init:
                 GObject.idle_add(self.req.emit, "status-changed", self.tid, status)
             self.status = status
+            if (old_status == self.STA_ACTIVE) != (status == self.STA_ACTIVE):
+                self._update_parents_active_child(self.parents)
 
         # Set closing date
         if status and status in [self.STA_DONE, self.STA_DISMISSED]:
@@ -254,11 +304,9 @@ class Task(TreeNode):
         self.last_modified = Date(value)
 
     def recursive_sync(self):
-        """Recursively sync the task and all task children. Defined"""
-        self.sync()
-        for sub_id in self.children:
-            sub = self.req.get_task(sub_id)
-            sub.recursive_sync()
+        """Sync the task and all its descendants, each of them once"""
+        for task in self._get_subtree():
+            task.sync()
 
     # ABOUT RECURRING TASKS
     # Like anything related to dates, repeating tasks are subtle and complex
@@ -299,18 +347,23 @@ class Task(TreeNode):
                 return False, None
 
             try:
-                # If a start date is already set,
-                # we should calculate the next date from that day.
-                if self.start_date == Date.no_date():
-                    start_from = Date(datetime.now())
-                else:
-                    start_from = self.start_date
-
-                newdate = start_from.parse_from_date(recurring_term, newtask)
-                return True, newdate
+                rule = compile_recurring_term(recurring_term)
             except ValueError:
                 return False, None
 
+            # If a start date is already set,
+            # we should calculate the next date from that day.
+            if self.start_date == Date.no_date():
+                start_from = date.today()
+            else:
+                start_from = self.start_date.date()
+
+            if newtask:
+                newdate = rule.first_occurrence(start_from)
+            else:
+                newdate = rule.next_occurrence(start_from)
+            return True, Date(newdate)
+
         self.recurring = recurring
         # We verifiy if the term passed is valid
         valid, newdate = is_valid_term()
@@ -393,23 +446,17 @@ class Task(TreeNode):
         Returns:
             Date: the next due date of a task
         """
+        try:
+            rule = compile_recurring_term(self.recurring_term)
+        except ValueError:
+            raise ValueError(f'Invalid recurring term {self.recurring_term}')
+
         today = date.today()
-        if today <= self.due_date:
-            try:
-                nextdate = self.due_date.parse_from_date(self.recurring_term, newtask=False)
-                while nextdate <= self.due_date:
-                    nextdate = nextdate.parse_from_date(self.recurring_term, newtask=False)
-                return nextdate
-            except Exception:
-                raise ValueError(f'Invalid recurring term {self.recurring_term}')
-        elif today > self.due_date:
-            try:
-                next_date = self.due_date.parse_from_date(self.recurring_term, newtask=False)
-                while next_date < date.today():
-                    next_date = next_date.parse_from_date(self.recurring_term, newtask=False)
-                return next_date
-            except Exception:
-                raise ValueError(f'Invalid recurring term {self.recurring_term}')
+        due = self.due_date.date()
+        if today <= due:
+            return Date(rule.next_occurrence(due))
+        else:
+            return Date(rule.next_occurrence(due, not_before=today))
 
     def is_parent_recurring(self):
         if self.has_parent():
@@ -460,60 +507,103 @@ class Task(TreeNode):
     # get_due_date_constraint method.
     def set_due_date(self, new_duedate):
         """Defines the task's due date."""
-
-        def __get_defined_parent_list(task):
-            """Recursively fetch a list of parents that have a defined due date
-               which is not fuzzy"""
-            parent_list = []
-            for par_id in task.parents:
-                par = self.req.get_task(par_id)
-                if par.get_due_date().is_fuzzy():
-                    parent_list += __get_defined_parent_list(par)
-                else:
-                    parent_list.append(par)
-            return parent_list
-
-        def __get_defined_child_list(task):
-            """Recursively fetch a list of children that have a defined
-               due date which is not fuzzy"""
-            child_list = []
-            for child_id in task.children:
-                child = self.req.get_task(child_id)
-                if child.get_due_date().is_fuzzy():
-                    child_list += __get_defined_child_list(child)
-                else:
-                    child_list.append(child)
-            return child_list
-
         old_due_date = self.due_date
         new_duedate_obj = Date(new_duedate)  # caching the conversion
         self.due_date = new_duedate_obj
         # If the new date is fuzzy or undefined, we don't update related tasks
-        if not new_duedate_obj.is_fuzzy():
-            # if some ancestors' due dates happen before the task's new
-            # due date, we update them (except for fuzzy dates)
-            for par in __get_defined_parent_list(self):
-                if par.get_due_date() < new_duedate_obj:
-                    par.set_due_date(new_duedate)
-            # we must apply the constraints to the defined & non-fuzzy children
-            # as well
-            for sub in __get_defined_child_list(self):
-                sub_duedate = sub.get_due_date()
-                # if the child's due date happens later than the task's: we
-                # update it to the task's new due date
-                if sub_duedate > new_duedate_obj:
-                    sub.set_due_date(new_duedate)
-                # if the child's start date happens later than
-                # the task's new due date, we update it
-                # (except for fuzzy start dates)
-                sub_startdate = sub.get_start_date()
-                if not sub_startdate.is_fuzzy() and \
-                        sub_startdate > new_duedate_obj:
-                    sub.set_start_date(new_duedate)
+        if new_duedate_obj.is_fuzzy():
+            due_changed, start_changed = {}, {}
+        else:
+            due_changed, start_changed = \
+                self._propagate_due_date(new_duedate_obj)
+
+        # Every constrained date is set to the new due date
+        for task in due_changed.values():
+            task.due_date = new_duedate_obj
+        for task in start_changed.values():
+            task.start_date = new_duedate_obj
+
         # If the date changed, we notify the change for the children since the
-        # constraints might have changed
+        # constraints might have changed. Each task is synced once.
+        to_sync = {}
         if old_due_date != new_duedate_obj:
-            self.recursive_sync()
+            due_changed[self.tid] = self
+        for task in due_changed.values():
+            for sub in task._get_subtree():
+                to_sync[sub.tid] = sub
+        to_sync.update(start_changed)
+        for task in to_sync.values():
+            task.sync()
+
+    def _propagate_due_date(self, due_date):
+        """Find the relatives whose dates conflict with the new due date.
+
+        Constraints are propagated in a single breadth-first pass: ancestors
+        due before due_date and descendants due after it are moved to
+        due_date, which in turn constrains their own relatives. Descendants
+        starting after due_date are made to start on it.
+
+        Returns a tuple of two dictionaries {tid: task}: the tasks whose due
+        date and the tasks whose start date must be set to due_date.
+        """
+        due_changed = {}
+        start_changed = {}
+        queue = deque([self])
+        while queue:
+            task = queue.popleft()
+            # if some ancestors' due dates happen before the task's new
+            # due date, we update them (except for fuzzy dates)
+            for par in task._get_defined_relatives('parents'):
+                if par.tid not in due_changed and par.due_date < due_date:
+                    due_changed[par.tid] = par
+                    queue.append(par)
+            # we must apply the constraints to the defined & non-fuzzy
+            # children as well
+            for sub in task._get_defined_relatives('children'):
+                if sub.tid not in due_changed and sub.due_date > due_date:
+                    due_changed[sub.tid] = sub
+                    queue.append(sub)
+                # if the child's start date happens later than the new due
+                # date, we update it (except for fuzzy start dates)
+                if not sub.start_date.is_fuzzy() and \
+                        sub.start_date > due_date:
+                    start_changed[sub.tid] = sub
+        return due_changed, start_changed
+
+    def _get_defined_relatives(self, relation):
+        """Fetch the parents or the children (relation is 'parents' or
+        'children') that have a defined due date which is not fuzzy,
+        looking through the ones whose due date is undefined or fuzzy"""
+        relatives = []
+        to_visit = deque(getattr(self, relation))
+        seen = set()
+        while to_visit:
+            tid = to_visit.popleft()
+            if tid in seen:
+                continue
+            seen.add(tid)
+            task = self.req.get_task(tid)
+            if task is None:
+                continue
+            if task.due_date.is_fuzzy():
+                to_visit.extend(getattr(task, relation))
+            else:
+                relatives.append(task)
+        return relatives
+
+    def _get_subtree(self):
+        """Return the task and all its descendants, each of them once"""
+        subtree = {self.tid: self}
+        to_visit = [self]
+        while to_visit:
+            task = to_visit.pop()
+            for sub_id in task.children:
+                if sub_id not in subtree:
+                    sub = self.req.get_task(sub_id)
+                    if sub is not None:
+                        subtree[sub_id] = sub
+                        to_visit.append(sub)
+        return subtree.values()
 
     def get_due_date(self):
         """ Returns the due date, which always respects all constraints """
@@ -592,6 +682,48 @@ class Task(TreeNode):
         closed_date = self.get_closed_date()
         return (closed_date - due_date).days
 
+    @property
+    def content(self):
+        return self._content
+
+    @content.setter
+    def content(self, value):
+        self._content = value
+        self._content_version += 1
+
+    def get_content_version(self):
+        """ Return a counter which changes whenever the content changes """
+        return self._content_version
+
+    def _get_content_cache(self):
+        """ Return the cache of forms derived from the content, emptied if
+        the content changed since they were computed """
+        if self._content_cache_version != self._content_version:
+            self._content_cache = {}
+            self._content_cache_version = self._content_version
+        return self._content_cache
+
+    def get_content_spans(self):
+        """ Return the content parsed into spans (see GTG.core.content),
+        cached until the content changes """
+        cache = self._get_content_cache()
+        try:
+            return cache['spans']
+        except KeyError:
+            spans = content_spans.parse_content(self.content)
+            cache['spans'] = spans
+            return spans
+
+    @property
+    def tags(self):
+        return self._tags
+
+    @tags.setter
+    def tags(self, value):
+        self._tags = list(value)
+        self._tags_set = set(self._tags)
+        self._content_version += 1
+
     def get_text(self):
         """ Return the content or empty string in case of None """
         if self.content:
@@ -612,35 +744,54 @@ class Task(TreeNode):
         equivalent to get_text with with all XML stripped down.
         Warning: all markup informations are stripped down. Empty lines are
         also removed
+
+        Excerpts are cached until the content changes.
         """
+        cache = self._get_content_cache()
+        key = ('excerpt', lines, char, strip_tags, strip_subtasks)
+        try:
+            return cache[key]
+        except KeyError:
+            pass
+
         # defensive programmation to avoid returning None
         if self.content:
-            txt = self.content
-
-            # Prevent issues with & in content
-            txt = saxutils.escape(txt)
-            txt = txt.strip()
+            spans = content_spans.strip_spans(self.get_content_spans())
 
             if strip_tags:
-                for tag in self.get_tags_name():
-                    txt = (txt.replace(f'@{tag}, ', '')
-                              .replace(f'@{tag},', '')
-                              .replace(f'@{tag}', ''))
+                spans = content_spans.strip_tags(spans, self.get_tags_name())
 
             if strip_subtasks:
-                txt = re.sub(r'\{\!.+\!\}', '', txt)
+                spans = [span for span in spans
+                         if span.kind != content_spans.SUBTASK]
+
+            # Prevent issues with & in content
+            txt = saxutils.escape(content_spans.render_content(spans))
 
             # Strip blank lines and get desired amount of lines
             txt = [line for line in txt.splitlines() if line]
-            txt = txt[:lines]
+            if lines > 0:
+                txt = txt[:lines]
             txt = '\n'.join(txt)
 
             # We keep the desired number of char
             if char > 0:
                 txt = txt[:char]
-            return txt
         else:
-            return ""
+            txt = ""
+
+        cache[key] = txt
+        return txt
+
+    def get_search_text(self):
+        """ Return the lower-cased plain text of the content, as used by
+        full-text search """
+        cache = self._get_content_cache()
+        try:
+            return cache['search']
+        except KeyError:
+            text = cache['search'] = self.get_excerpt().lower()
+            return text
 
     def __strip_content(self, element, strip_subtasks=False):
         txt = ""
@@ -679,6 +830,7 @@ class Task(TreeNode):
         self.can_be_deleted = False
         # the core of the method is in the TreeNode object
         TreeNode.add_child(self, tid)
+        self.update_active_child(tid)
         # now we set inherited attributes only if it's a new task
         child = self.req.get_task(tid)
         if self.is_loaded() and child and child.can_be_deleted:
@@ -708,6 +860,55 @@ class Task(TreeNode):
         else:
             return False
 
+    def add_parent(self, parent_id):
+        """Add a parent task, which then counts this task if active"""
+        result = TreeNode.add_parent(self, parent_id)
+        self._update_parents_active_child([parent_id])
+        return result
+
+    def remove_parent(self, parent_id):
+        """Remove a parent task, which then stops counting this task"""
+        result = TreeNode.remove_parent(self, parent_id)
+        self._update_parents_active_child([parent_id])
+        return result
+
+    def _update_parents_active_child(self, parent_ids):
+        for parent_id in parent_ids:
+            par = self.req.get_task(parent_id)
+            if par is not None:
+                par.update_active_child(self.tid)
+
+    def update_active_child(self, tid):
+        """Count or stop counting the task tid in the active subtasks, after
+        it changed status or was added or removed as a subtask"""
+        if self._active_children is None:
+            return
+        child = self.req.get_task(tid)
+        if tid in self.children and child is not None and \
+                child.get_status() == self.STA_ACTIVE:
+            self._active_children.add(tid)
+        else:
+            self._active_children.discard(tid)
+        self._active_children_links = len(self.children)
+
+    def count_active_children(self):
+        """Return the number of active subtasks in the tree.
+
+        The count is kept up to date by update_active_child(). The subtasks
+        are only counted again the first time or if their number changed
+        without this task knowing it, e.g. when liblarch moves a dropped
+        task or deletes a subtask.
+        """
+        if self._active_children is None or \
+                self._active_children_links != len(self.children):
+            tree = self.get_tree()
+            self._active_children = {
+                child_id for child_id in self.children
+                if tree.has_node(child_id) and
+                tree.get_node(child_id).get_status() == self.STA_ACTIVE}
+            self._active_children_links = len(self.children)
+        return len(self._active_children)
+
     # FIXME: remove this function and use liblarch instead.
     def get_subtasks(self):
         tree = self.get_tree()
@@ -715,7 +916,9 @@ class Task(TreeNode):
 
     def set_parent(self, parent_id):
         """Update the task's parent. Refresh due date constraints."""
+        old_parents = list(self.parents)
         TreeNode.set_parent(self, parent_id)
+        self._update_parents_active_child(old_parents + list(self.parents))
         if parent_id is not None:
             par = self.req.get_task(parent_id)
             par_duedate = par.get_due_date_constraint()
@@ -749,11 +952,20 @@ class Task(TreeNode):
             return self.is_loaded()
         self._modified_update()
         if self.is_loaded():
-            # This is a liblarch call to the TreeNode ancestor
-            self.modified()
+            self.req.ds.tasks_changed()
+            # Within Requester.batch(), the notification is sent once at the
+            # end of the batch
+            if not self.req.ds.defer_sync(self.tid):
+                # This is a liblarch call to the TreeNode ancestor
+                self.modified()
             return True
         return False
 
+    def modified(self, priority="low"):
+        """Notify liblarch that the task changed (see TreeNode.modified())"""
+        self.req.ds.tasks_changed()
+        TreeNode.modified(self, priority)
+
     def _modified_update(self):
         """
         Updates the modified timestamp
@@ -778,7 +990,8 @@ class Task(TreeNode):
     def rename_tag(self, old, new):
         eold = saxutils.escape(saxutils.unescape(old))
         enew = saxutils.escape(saxutils.unescape(new))
-        self.content = self.content.replace(eold, enew)
+        spans = content_spans.rename_tag(self.get_content_spans(), eold, enew)
+        self.content = content_spans.render_content(spans)
         oldt = self.req.get_tag(old)
         self.remove_tag(old)
         oldt.modified()
@@ -786,6 +999,25 @@ class Task(TreeNode):
         self.req.get_tag(new).modified()
         self.sync()
 
+    def replace_tag(self, old, new):
+        """
+        Replace the tag old by new in the tags and in the content.
+
+        Used to rename and merge tags: unlike rename_tag(), subtasks are left
+        alone since the caller goes through every task of the tag.
+        """
+        eold = saxutils.escape(saxutils.unescape(old))
+        enew = saxutils.escape(saxutils.unescape(new))
+        spans = content_spans.rename_tag(self.get_content_spans(), eold, enew)
+        self.content = content_spans.render_content(spans)
+        tags = []
+        for tagname in self._tags:
+            tagname = new if tagname == old else tagname
+            if tagname not in tags:
+                tags.append(tagname)
+        self.tags = tags
+        self.sync()
+
     def tag_added_by_id(self, tid):
         """Add a tag by its ID"""
 
@@ -798,8 +1030,11 @@ class Task(TreeNode):
         """
         Adds a tag. Does not add '@tag' to the contents. See add_tag
         """
-        if tagname not in self.tags:
-            self.tags.append(tagname)
+        if tagname not in self._tags_set:
+            self._tags.append(tagname)
+            self._tags_set.add(tagname)
+            # stripped excerpts depend on the tags
+            self._content_version += 1
             if self.is_loaded():
                 for child in self.get_subtasks():
                     if child.can_be_deleted:
@@ -808,6 +1043,7 @@ class Task(TreeNode):
                 tag = self.req.get_tag(tagname)
                 if not tag:
                     tag = self.req.new_tag(tagname)
+                tag.update_task(self.get_id())
                 tag.modified()
             return True
 
@@ -838,13 +1074,16 @@ class Task(TreeNode):
     # remove by tagname
     def remove_tag(self, tagname):
         modified = False
-        if tagname in self.tags:
-            self.tags.remove(tagname)
+        if tagname in self._tags_set:
+            self._tags.remove(tagname)
+            self._tags_set.discard(tagname)
+            self._content_version += 1
             modified = True
             for child in self.get_subtasks():
                 if child.can_be_deleted:
                     child.remove_tag(tagname)
-        self.content = self._strip_tag(self.content, tagname)
+        spans = content_spans.remove_tag(self.get_content_spans(), tagname)
+        self.content = content_spans.render_content(spans)
         if modified:
             tag = self.req.get_tag(tagname)
             # The ViewCount of the tag still doesn't know that
@@ -853,55 +1092,24 @@ class Task(TreeNode):
                 tag.update_task(self.get_id())
                 tag.modified()
 
-    def _strip_tag(self, text, tagname, newtag=''):
-        if tagname.startswith('@'):
-            inline_tag = tagname[1:]
-        else:
-            inline_tag = tagname
-
-        return (text
-                .replace(f'@{tagname}\n\n', newtag)
-                .replace(f'@{tagname}\n', newtag)
-                .replace(f'@{tagname}, ', newtag)
-                .replace(f'@{tagname}', newtag)
-                .replace(f'{tagname}\n\n', newtag)
-                .replace(f'{tagname}, ', newtag)
-                .replace(f'{tagname},', inline_tag)
-                # don't forget a space a the end
-                .replace(f'{tagname}', inline_tag))
-
     # tag_list is a list of tags names
-    # return true if at least one of the list is in the task
+    # return true if at least one of the list (or one of their descendant
+    # tags) is in the task
     def has_tags(self, tag_list=None, notag_only=False):
-        # recursive function to explore the tags and its children
-        def children_tag(tagname):
-            toreturn = False
-            if tagname in self.tags:
-                toreturn = True
-            else:
-                tag = self.req.get_tag(tagname)
-                if tag:
-                    for tagc_name in tag.get_children():
-                        if not toreturn:
-                            toreturn = children_tag(tagc_name)
-            return toreturn
-
         # We want to see if the task has no tags
-        toreturn = False
         if notag_only:
-            toreturn = self.tags == []
+            return not self._tags_set
         # Here, the user ask for the "empty" tag
         # And virtually every task has it.
-        elif tag_list == [] or tag_list is None:
-            toreturn = True
-        elif tag_list:
-            for tagname in tag_list:
-                if not toreturn:
-                    toreturn = children_tag(tagname)
-        else:
-            # Well, if we don't filter on tags or notag, it's true, of course
-            toreturn = True
-        return toreturn
+        if not tag_list:
+            return True
+        for tagname in tag_list:
+            if tagname in self._tags_set:
+                return True
+            closure = self.req.get_tag_closure(tagname)
+            if not self._tags_set.isdisjoint(closure):
+                return True
+        return False
 
     def __str__(self):
         return '<Task title="%s" id="%s" status="%s" tags="%s" added="%s" recurring="%s">' % (
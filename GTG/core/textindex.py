@@ -0,0 +1,244 @@
+# -----------------------------------------------------------------------------
+# Getting Things GNOME! - a personal organizer for the GNOME desktop
+# Copyright (c) 2008-2013 - Lionel Dricot & Bertrand Rousseau
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+
+"""
+Indexes of the text of the tasks: TextIndex is used by the search to find the
+tasks which may contain a word without looking at the text of every task, and
+FuzzyIndex finds the tasks whose title looks like some text.
+"""
+
+import heapq
+
+from GTG.core.search import split_words
+
+# Length of the pieces of text which are indexed
+NGRAM_SIZE = 3
+
+
+def _ngrams(text):
+    """ Return the set of the pieces of NGRAM_SIZE characters of text """
+    return {text[i:i + NGRAM_SIZE]
+            for i in range(len(text) - NGRAM_SIZE + 1)}
+
+
+class TextIndex():
+    """
+    Keeps, for each piece of NGRAM_SIZE characters, the ids of the tasks
+    whose text contains it.
+
+    Words are searched as substrings, so a task contains a word only if it
+    contains all the pieces of the word: the tasks having all of them are
+    the candidates, which still have to be checked.
+
+    The text of a task is given by the function get_text(tid), which
+    returns the lower-cased text or None if the task doesn't exist anymore.
+    Tasks marked by invalidate() are indexed again on the next query, so
+    that nothing is done until the index is used.
+    """
+
+    def __init__(self, get_text):
+        self._get_text = get_text
+        # piece of text -> set of task ids
+        self._tasks = {}
+        # task id -> indexed text
+        self._texts = {}
+        self._dirty = set()
+        # word -> candidates, valid until an indexed text changes
+        self._candidates = {}
+
+    def invalidate(self, tid):
+        """ Mark the text of a task as changed (or the task as removed) """
+        self._dirty.add(tid)
+
+    def _refresh(self):
+        """ Index again the texts of the tasks marked by invalidate() """
+        dirty, self._dirty = self._dirty, set()
+        for tid in dirty:
+            text = self._get_text(tid)
+            old_text = self._texts.get(tid)
+            if text == old_text:
+                continue
+
+            self._candidates.clear()
+            old_ngrams = _ngrams(old_text) if old_text else set()
+            new_ngrams = _ngrams(text) if text else set()
+            for ngram in old_ngrams - new_ngrams:
+                tasks = self._tasks[ngram]
+                tasks.discard(tid)
+                if not tasks:
+                    del self._tasks[ngram]
+            for ngram in new_ngrams - old_ngrams:
+                self._tasks.setdefault(ngram, set()).add(tid)
+
+            if text is None:
+                self._texts.pop(tid, None)
+            else:
+                self._texts[tid] = text
+
+    def get_candidates(self, word):
+        """
+        Return the ids of the tasks which may contain word, or None if the
+        word is too short to tell. The returned set must not be modified.
+        """
+        if len(word) < NGRAM_SIZE:
+            return None
+        if self._dirty:
+            self._refresh()
+        try:
+            return self._candidates[word]
+        except KeyError:
+            pass
+
+        postings = sorted((self._tasks.get(ngram, set())
+                           for ngram in _ngrams(word)), key=len)
+        candidates = set(postings[0])
+        for tasks in postings[1:]:
+            if not candidates:
+                break
+            candidates &= tasks
+        self._candidates[word] = candidates
+        return candidates
+
+
+def _word_ngrams(text):
+    """ Return the set of the pieces of NGRAM_SIZE characters of the words
+    of text, padded so that short words and word boundaries count too
+
+    The words are split like the words of a search query. """
+    ngrams = set()
+    padding = ' ' * (NGRAM_SIZE - 1)
+    for word in split_words(text):
+        ngrams |= _ngrams(f'{padding}{word} ')
+    return ngrams
+
+
+class FuzzyIndex():
+    """
+    Keeps, for each piece of NGRAM_SIZE characters of the words of the
+    titles and tags of the tasks, the ids of the tasks having it.
+
+    Tasks are ranked by the share of the pieces of the searched text they
+    have, so that a word with a typo still finds the task. Like TextIndex,
+    the text of a task is given by get_text(tid) and tasks marked by
+    invalidate() are indexed again on the next query.
+    """
+
+    def __init__(self, get_text):
+        self._get_text = get_text
+        # piece of text -> set of task ids
+        self._tasks = {}
+        # task id -> set of pieces of text
+        self._ngrams = {}
+        self._dirty = set()
+        # (text, min_score) -> matching tasks, valid until an indexed text
+        # changes
+        self._matches = {}
+
+    def invalidate(self, tid):
+        """ Mark the text of a task as changed (or the task as removed) """
+        self._dirty.add(tid)
+
+    def _refresh(self):
+        """ Index again the texts of the tasks marked by invalidate() """
+        dirty, self._dirty = self._dirty, set()
+        for tid in dirty:
+            text = self._get_text(tid)
+            new_ngrams = _word_ngrams(text) if text else set()
+            old_ngrams = self._ngrams.get(tid, set())
+            if new_ngrams == old_ngrams:
+                continue
+
+            self._matches.clear()
+            for ngram in old_ngrams - new_ngrams:
+                tasks = self._tasks[ngram]
+                tasks.discard(tid)
+                if not tasks:
+                    del self._tasks[ngram]
+            for ngram in new_ngrams - old_ngrams:
+                self._tasks.setdefault(ngram, set()).add(tid)
+
+            if new_ngrams:
+                self._ngrams[tid] = new_ngrams
+            else:
+                self._ngrams.pop(tid, None)
+
+    def get_candidates(self, text):
+        """ Return the ids of the tasks having all the words of text """
+        if self._dirty:
+            self._refresh()
+        postings = sorted((self._tasks.get(ngram, set())
+                           for ngram in _word_ngrams(text)), key=len)
+        if not postings:
+            return set()
+        candidates = set(postings[0])
+        for tasks in postings[1:]:
+            if not candidates:
+                break
+            candidates &= tasks
+        return candidates
+
+    def _score(self, ngrams, min_score):
+        """ Return the tasks having at least min_score of ngrams, with the
+        number of them they have """
+        common = {}
+        for ngram in ngrams:
+            for tid in self._tasks.get(ngram, ()):
+                common[tid] = common.get(tid, 0) + 1
+        threshold = min_score * len(ngrams)
+        return {tid: count for tid, count in common.items()
+                if count >= threshold}
+
+    def search(self, text, limit=10, min_score=0.3):
+        """
+        Return the ids of the tasks best matching text, best first
+
+        @param limit: maximum number of results
+        @param min_score: minimum share of the pieces of text a task must have
+        """
+        if self._dirty:
+            self._refresh()
+        ngrams = _word_ngrams(text)
+        if not ngrams:
+            return []
+        matching = self._score(ngrams, min_score)
+
+        # Share of the searched pieces found in the task, then similarity
+        # of the whole texts to prefer the shorter titles
+        def score(tid):
+            count = matching[tid]
+            return (count / len(ngrams),
+                    2 * count / (len(ngrams) + len(self._ngrams[tid])))
+
+        return heapq.nlargest(limit, matching, key=score)
+
+    def get_matches(self, text, min_score=0.3):
+        """
+        Return the set of the ids of the tasks matching text, as search()
+        without limit. The returned set must not be modified.
+        """
+        if self._dirty:
+            self._refresh()
+        try:
+            return self._matches[text, min_score]
+        except KeyError:
+            pass
+
+        ngrams = _word_ngrams(text)
+        matches = set(self._score(ngrams, min_score)) if ngrams else set()
+        self._matches[text, min_score] = matches
+        return matches
@@ -16,22 +16,27 @@
 # this program.  If not, see <http://www.gnu.org/licenses/>.
 # -----------------------------------------------------------------------------
 
-from datetime import datetime
-
+from GTG.core.filterstats import FilterStats
 from GTG.core.search import search_filter
 from GTG.core import tag
 from GTG.core.task import Task
 from gettext import gettext as _
-from GTG.core.dates import Date
+from GTG.core.dates import Date, work_day
 from liblarch import Tree
 
 
 class TreeFactory():
 
-    def __init__(self):
+    def __init__(self, filter_stats=None):
+        # Measures the filters added to the trees, see GTG.core.filterstats
+        self.filter_stats = filter_stats or FilterStats(enabled=False)
         # Keep the tree in memory jus in case we have to use it for filters.
         self.tasktree = None
         self.tagtree = None
+        # Results of workview() by task id, valid for one generation of the
+        # tasks and one part of the day
+        self._workview_cache = {}
+        self._workview_generation = None
 
     def get_tasks_tree(self):
         """This create a liblarch tree suitable for tasks,
@@ -51,6 +56,7 @@ class TreeFactory():
             'worktostart': [self.worktostart],
             'worklate': [self.worklate],
             'no_disabled_tag': [self.no_disabled_tag],
+            'search_page': [self.in_search_page],
         }
 
         for f in f_dic:
@@ -59,7 +65,7 @@ class TreeFactory():
                 param = filt[1]
             else:
                 param = None
-            tasktree.add_filter(f, filt[0], param)
+            tasktree.add_filter(f, self.filter_stats.wrap(f, filt[0]), param)
         self.tasktree = tasktree
         return tasktree
 
@@ -79,7 +85,9 @@ class TreeFactory():
         tagtree.add_node(alltag)
         p = {}
         self.tasktree.add_filter(tag.ALLTASKS_TAG,
-                                 self.alltag, parameters=p)
+                                 self.filter_stats.wrap(tag.ALLTASKS_TAG,
+                                                        self.alltag),
+                                 parameters=p)
         # Build the "without tag tag"
         notag_tag = tag.Tag(tag.NOTAG_TAG, req=req)
         notag_tag.set_attribute("special", "notag")
@@ -90,7 +98,9 @@ class TreeFactory():
         tagtree.add_node(notag_tag)
         p = {}
         self.tasktree.add_filter(tag.NOTAG_TAG,
-                                 self.notag, parameters=p)
+                                 self.filter_stats.wrap(tag.NOTAG_TAG,
+                                                        self.notag),
+                                 parameters=p)
 
         # Build the search tag
         search_tag = tag.Tag(tag.SEARCH_TAG, req=req)
@@ -101,7 +111,9 @@ class TreeFactory():
         tagtree.add_node(search_tag)
         p = {}
         self.tasktree.add_filter(tag.SEARCH_TAG,
-                                 search_filter, parameters=p)
+                                 self.filter_stats.wrap(tag.SEARCH_TAG,
+                                                        search_filter),
+                                 parameters=p)
 
         # Build the separator
         sep_tag = tag.Tag(tag.SEP_TAG, req=req)
@@ -110,8 +122,10 @@ class TreeFactory():
         tagtree.add_node(sep_tag)
 
         # Filters
-        tagtree.add_filter('activetag', self.actively_used_tag)
-        tagtree.add_filter('usedtag', self.used_tag)
+        tagtree.add_filter('activetag', self.filter_stats.wrap(
+            'activetag', self.actively_used_tag))
+        tagtree.add_filter('usedtag', self.filter_stats.wrap(
+            'usedtag', self.used_tag))
 
         activeview = tagtree.get_viewtree(name='activetags', refresh=False)
         activeview.apply_filter('activetag')
@@ -154,16 +168,7 @@ class TreeFactory():
 
     def is_workable(self, task, parameters=None):
         """ Filter of tasks that can be worked """
-        tree = task.get_tree()
-        for child_id in task.get_children():
-            if not tree.has_node(child_id):
-                continue
-
-            child = tree.get_node(child_id)
-            if child.get_status() == Task.STA_ACTIVE:
-                return False
-
-        return True
+        return task.count_active_children() == 0
 
     def is_started(self, task, parameters=None):
         """ Filter for tasks that are already started """
@@ -174,16 +179,33 @@ class TreeFactory():
             return True
         elif days_left == 0:
             # Don't count today's tasks started until morning
-            return datetime.now().hour > 4
+            return work_day()[1]
         else:
             return days_left < 0
 
     def workview(self, task, parameters=None):
+        """ Filter of tasks to work on
+
+        The result is shared by the work* filters until a task changes (see
+        DataStore.tasks_changed()) or the subtasks of the task change. It
+        also depends on the part of the day, see is_started().
+        """
+        generation = (task.req.ds.tasks_generation, work_day())
+        if generation != self._workview_generation:
+            self._workview_cache = {}
+            self._workview_generation = generation
+
+        children = task.get_children()
+        cached = self._workview_cache.get(task.get_id())
+        if cached is not None and cached[0] == children:
+            return cached[1]
+
         wv = self.active(task) and \
             self.is_started(task) and \
             self.is_workable(task) and \
             self.no_disabled_tag(task) and \
             task.get_due_date() != Date.someday()
+        self._workview_cache[task.get_id()] = (list(children), wv)
         return wv
 
     def workdue(self, task):
@@ -217,10 +239,16 @@ class TreeFactory():
         ret = task.get_status() in [Task.STA_DISMISSED, Task.STA_DONE]
         return ret
 
+    def in_search_page(self, task, parameters=None):
+        """ Filter of the tasks found so far by a paged search """
+        return parameters is not None and \
+            task.get_id() in parameters.get('tasks', ())
+
     def no_disabled_tag(self, task, parameters=None):
-        """Filter of task that don't have any disabled/nonactionable tag"""
-        toreturn = True
-        for t in task.get_tags():
-            if t.get_attribute("nonactionable") == "True":
-                toreturn = False
-        return toreturn
+        """Filter of task that don't have any disabled/nonactionable tag
+
+        Subtags of a nonactionable tag are nonactionable too, see
+        DataStore.get_nonactionable_tags().
+        """
+        nonactionable = task.req.ds.get_nonactionable_tags()
+        return nonactionable.isdisjoint(task.get_tags_name())
@@ -106,6 +106,8 @@ class Application(Gtk.Application):
 
             # Register backends
             datastore = DataStore()
+            # Coalesce task notifications once per main loop iteration
+            datastore.coalesce_syncs = True
 
             for backend_dic in BackendFactory().get_saved_backends_list():
                 datastore.register_backend(backend_dic)
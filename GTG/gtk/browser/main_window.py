@@ -29,7 +29,7 @@ from gi.repository import GObject, Gtk, Gdk, Gio, GLib
 from GTG.core import info
 from GTG.backends.backend_signals import BackendSignals
 from GTG.core.dirs import ICONS_DIR
-from GTG.core.search import parse_search_query, InvalidQuery
+from GTG.core.search import InvalidQuery, SearchCache
 from GTG.core.tag import SEARCH_TAG
 from GTG.core.task import Task
 from gettext import gettext as _
@@ -52,6 +52,9 @@ PANE_STACK_NAMES_MAP = {
 }
 PANE_STACK_NAMES_MAP_INVERTED = {v: k for k, v in PANE_STACK_NAMES_MAP.items()}
 
+# Filter showing the closed tasks found so far by a search
+SEARCH_PAGE_FILTER = 'search_page'
+
 
 class MainWindow(Gtk.ApplicationWindow):
     """ The UI for browsing open and closed tasks,
@@ -76,6 +79,13 @@ class MainWindow(Gtk.ApplicationWindow):
 
         # Timeout handler for search
         self.search_timeout = None
+        # Parameters and results of the last searches
+        self.search_cache = SearchCache(self.req.get_search_parameters)
+        # Search of the closed tasks being shown a page at a time
+        self.closed_search = None
+        self.closed_search_timeout = None
+        # Query whose results are shown in the closed pane
+        self.closed_search_query = None
 
         # Treeviews handlers
         self.vtree_panes = {}
@@ -425,6 +435,9 @@ class MainWindow(Gtk.ApplicationWindow):
         self.vtree_panes['closed'].connect('key-press-event', clsd_tsk_key_prs)
         self.vtree_panes['closed'].connect('cursor-changed', self.on_cursor_changed)
 
+        # Redraw the tasks when the color or icon of a tag changes
+        self.req.connect('tag-style-changed', self.on_tag_style_changed)
+
         b_signals = BackendSignals()
         b_signals.connect(b_signals.BACKEND_FAILED, self.on_backend_failed)
         b_signals.connect(b_signals.BACKEND_STATE_TOGGLED, self.remove_backend_infobar)
@@ -444,7 +457,11 @@ class MainWindow(Gtk.ApplicationWindow):
             self.search_button.set_active(False)
             self.searchbar.set_search_mode(False)
             self.search_entry.set_text('')
-            self.get_selected_tree().unapply_filter(SEARCH_TAG)
+            self._stop_closed_search()
+            self.closed_search_query = None
+            vtree = self.get_selected_tree()
+            vtree.unapply_filter(SEARCH_TAG)
+            vtree.unapply_filter(SEARCH_PAGE_FILTER)
         else:
             self.search_button.set_active(True)
             self.searchbar.set_search_mode(True)
@@ -452,13 +469,58 @@ class MainWindow(Gtk.ApplicationWindow):
 
     def _try_filter_by_query(self, query, refresh: bool = True):
         log.debug("Searching for %r", query)
+        self._stop_closed_search()
         vtree = self.get_selected_tree()
         try:
-            vtree.apply_filter(SEARCH_TAG, parse_search_query(query),
-                               refresh=refresh)
+            parameters = self.search_cache.get_parameters(query)
         except InvalidQuery as error:
             log.debug("Invalid query %r: %r", query, error)
             vtree.unapply_filter(SEARCH_TAG)
+            vtree.unapply_filter(SEARCH_PAGE_FILTER)
+            self.closed_search_query = None
+            return
+
+        if self.get_selected_pane() == 'closed':
+            self.closed_search_query = query
+            self._start_closed_search(vtree, parameters, refresh)
+        else:
+            vtree.apply_filter(SEARCH_TAG, parameters, refresh=refresh)
+
+    def _start_closed_search(self, vtree, parameters, refresh):
+        """Show the closed tasks matching a search a page at a time,
+        the most recently closed first."""
+
+        self.closed_search = self.req.search_closed_tasks(parameters)
+        found = {'tasks': set()}
+        vtree.apply_filter(SEARCH_PAGE_FILTER, found, refresh=refresh)
+        self.closed_search_timeout = GLib.idle_add(
+            self._on_closed_search_page, vtree, found)
+
+    def _on_closed_search_page(self, vtree, found):
+        """Add the next page of a closed tasks search to the view."""
+
+        tasks = self.closed_search.next_page()
+        if tasks:
+            # The filter applied once reads found: only the new tasks need
+            # to be filtered again
+            found['tasks'].update(tasks)
+            self.req.refresh_task_views(tasks)
+
+        if self.closed_search.is_done():
+            self.closed_search = None
+            self.closed_search_timeout = None
+            return False
+        return True
+
+    def _stop_closed_search(self):
+        """Cancel the search of closed tasks in progress, if any."""
+
+        if self.closed_search_timeout is not None:
+            GLib.source_remove(self.closed_search_timeout)
+            self.closed_search_timeout = None
+            # the closed pane only shows part of the results
+            self.closed_search_query = None
+        self.closed_search = None
 
 
     def do_search(self):
@@ -472,7 +534,9 @@ class MainWindow(Gtk.ApplicationWindow):
     def on_search(self, data):
         """Callback everytime a character is inserted in the search field."""
 
-        TIMEOUT = 500
+        # Searches only check the tasks which may match, so a short delay
+        # is enough to group the keystrokes
+        TIMEOUT = 200
 
         if self.search_timeout:
             GLib.source_remove(self.search_timeout)
@@ -597,14 +661,21 @@ class MainWindow(Gtk.ApplicationWindow):
         for t in self.config.get("opened_tasks"):
             GLib.idle_add(open_task, self.req, t)
 
+    def on_tag_style_changed(self, req, tagname):
+        """Redraw the task rows, without modifying the tasks themselves"""
+        for pane in self.vtree_panes.values():
+            pane.queue_draw()
+
     def refresh_all_views(self, timer):
-        collapsed = self.config.get("collapsed_tasks")
+        """Filter again the tasks whose dates make them change with the day
 
-        for pane in 'active', 'workview', 'closed':
-            self.req.get_tasks_tree(pane, False).reset_filters(refresh=False)
-        self.reapply_filter()
+        The other tasks keep their place in the views; only the date
+        columns need to be drawn again.
+        """
+        self.req.refresh_task_views(self.req.get_tasks_changed_by_day())
 
-        self.restore_collapsed_tasks(collapsed)
+        for pane in self.vtree_panes.values():
+            pane.queue_draw()
 
     def find_value_in_treestore(self, store, treeiter, value):
         """Search for value in tree store recursively."""
@@ -1082,8 +1153,9 @@ class MainWindow(Gtk.ApplicationWindow):
         start_date = Date.parse(new_start_date)
 
         # FIXME:If the task dialog is displayed, refresh its start_date widget
-        for task in tasks:
-            task.set_start_date(start_date)
+        with self.req.batch():
+            for task in tasks:
+                task.set_start_date(start_date)
 
     def update_start_to_next_day(self, day_number):
         """Update start date to N days from today."""
@@ -1094,8 +1166,9 @@ class MainWindow(Gtk.ApplicationWindow):
 
         next_day = Date.today() + datetime.timedelta(days=day_number)
 
-        for task in tasks:
-            task.set_start_date(next_day)
+        with self.req.batch():
+            for task in tasks:
+                task.set_start_date(next_day)
 
     def on_mark_as_started(self, action, param):
         self.update_start_date(None, "today")
@@ -1155,8 +1228,9 @@ class MainWindow(Gtk.ApplicationWindow):
         due_date = Date.parse(new_due_date)
 
         # FIXME: If the task dialog is displayed, refresh its due_date widget
-        for task in tasks:
-            task.set_due_date(due_date)
+        with self.req.batch():
+            for task in tasks:
+                task.set_due_date(due_date)
 
     def on_set_due_today(self, action, param):
         self.update_due_date(None, "today")
@@ -1217,15 +1291,17 @@ class MainWindow(Gtk.ApplicationWindow):
                  for uid in self.get_selected_tasks()
                  if uid is not None]
 
-        for task in tasks:
-            task.set_recurring(recurring, recurring_term, True)
+        with self.req.batch():
+            for task in tasks:
+                task.set_recurring(recurring, recurring_term, True)
 
     def update_toggle_recurring(self):
         tasks = [self.req.get_task(uid)
                  for uid in self.get_selected_tasks()
                  if uid is not None]
-        for task in tasks:
-            task.toggle_recurring()
+        with self.req.batch():
+            for task in tasks:
+                task.toggle_recurring()
 
     def on_set_recurring_every_day(self, action, param):
         self.update_recurring(True, 'day')
@@ -1249,12 +1325,13 @@ class MainWindow(Gtk.ApplicationWindow):
         # Get tasks' list from task names' list
         tasks = [self.req.get_task(task) for task in self.get_selected_tasks()]
         date, date_kind = calendar.get_selected_date()
-        if date_kind == GTGCalendar.DATE_KIND_DUE:
-            for task in tasks:
-                task.set_due_date(date)
-        elif date_kind == GTGCalendar.DATE_KIND_START:
-            for task in tasks:
-                task.set_start_date(date)
+        with self.req.batch():
+            if date_kind == GTGCalendar.DATE_KIND_DUE:
+                for task in tasks:
+                    task.set_due_date(date)
+            elif date_kind == GTGCalendar.DATE_KIND_START:
+                for task in tasks:
+                    task.set_start_date(date)
 
     def on_modify_tags(self, action, params):
         """Open modify tags dialog for selected tasks."""
@@ -1284,20 +1361,20 @@ class MainWindow(Gtk.ApplicationWindow):
             return
         tasks = [self.req.get_task(uid) for uid in tasks_uid]
         tasks_status = [task.get_status() for task in tasks]
-        for uid, task, status in zip(tasks_uid, tasks, tasks_status):
-            if status == Task.STA_DONE:
-                # Marking as undone
-                task.set_status(Task.STA_ACTIVE)
-                GObject.idle_add(self.emit, "task-marked-as-not-done", task.get_id())
-                # Parents of that task must be updated - not to be shown
-                # in workview, update children count, etc.
-                for parent_id in task.get_parents():
-                    parent = self.req.get_task(parent_id)
-                    parent.modified()
-            else:
-                task.set_status(Task.STA_DONE)
-                self.close_all_task_editors(uid)
-                GObject.idle_add(self.emit, "task-marked-as-done", task.get_id())
+        with self.req.batch():
+            for uid, task, status in zip(tasks_uid, tasks, tasks_status):
+                if status == Task.STA_DONE:
+                    # Marking as undone
+                    task.set_status(Task.STA_ACTIVE)
+                    GObject.idle_add(self.emit, "task-marked-as-not-done", task.get_id())
+                    # Parents of that task must be updated - not to be shown
+                    # in workview, update children count, etc.
+                    for parent_id in task.get_parents():
+                        self.req.refresh_task(parent_id)
+                else:
+                    task.set_status(Task.STA_DONE)
+                    self.close_all_task_editors(uid)
+                    GObject.idle_add(self.emit, "task-marked-as-done", task.get_id())
 
     def on_dismiss_task(self, widget=None):
         tasks_uid = [uid for uid in self.get_selected_tasks()
@@ -1306,29 +1383,30 @@ class MainWindow(Gtk.ApplicationWindow):
             return
         tasks = [self.req.get_task(uid) for uid in tasks_uid]
         tasks_status = [task.get_status() for task in tasks]
-        for uid, task, status in zip(tasks_uid, tasks, tasks_status):
-            if status == Task.STA_DISMISSED:
-                task.set_status(Task.STA_ACTIVE)
-            else:
-                task.set_status(Task.STA_DISMISSED)
-                self.close_all_task_editors(uid)
+        with self.req.batch():
+            for uid, task, status in zip(tasks_uid, tasks, tasks_status):
+                if status == Task.STA_DISMISSED:
+                    task.set_status(Task.STA_ACTIVE)
+                else:
+                    task.set_status(Task.STA_DISMISSED)
+                    self.close_all_task_editors(uid)
 
     def on_reopen_task(self, widget=None):
         tasks_uid = [uid for uid in self.get_selected_tasks()
                      if uid is not None]
         tasks = [self.req.get_task(uid) for uid in tasks_uid]
         tasks_status = [task.get_status() for task in tasks]
-        for uid, task, status in zip(tasks_uid, tasks, tasks_status):
-            if status == Task.STA_DONE:
-                task.set_status(Task.STA_ACTIVE)
-                GObject.idle_add(self.emit, "task-marked-as-not-done", task.get_id())
-                # Parents of that task must be updated - not to be shown
-                # in workview, update children count, etc.
-                for parent_id in task.get_parents():
-                    parent = self.req.get_task(parent_id)
-                    parent.modified()
-            elif status == Task.STA_DISMISSED:
-                task.set_status(Task.STA_ACTIVE)
+        with self.req.batch():
+            for uid, task, status in zip(tasks_uid, tasks, tasks_status):
+                if status == Task.STA_DONE:
+                    task.set_status(Task.STA_ACTIVE)
+                    GObject.idle_add(self.emit, "task-marked-as-not-done", task.get_id())
+                    # Parents of that task must be updated - not to be shown
+                    # in workview, update children count, etc.
+                    for parent_id in task.get_parents():
+                        self.req.refresh_task(parent_id)
+                elif status == Task.STA_DISMISSED:
+                    task.set_status(Task.STA_ACTIVE)
 
     def reapply_filter(self, current_pane: str = None):
         if current_pane is None:
@@ -1336,23 +1414,33 @@ class MainWindow(Gtk.ApplicationWindow):
         filters = self.get_selected_tags()
         filters.append(current_pane)
         vtree = self.req.get_tasks_tree(name=current_pane, refresh=False)
-        # Re-applying search if some search is specified
+        # Re-applying search if some search is specified. The closed pane
+        # shows it a page at a time, with its own filter.
         search = self.search_entry.get_text()
+        search_filter = SEARCH_TAG
+        if current_pane == 'closed':
+            search_filter = SEARCH_PAGE_FILTER
         if search:
-            filters.append(SEARCH_TAG)
+            filters.append(search_filter)
         # only resetting filters if the applied filters are different from
         # current ones, leaving a chance for liblarch to make the good call on
         # whether to refilter or not
-        if sorted(filters) != sorted(vtree.list_applied_filters()):
+        filters_changed = sorted(filters) != sorted(vtree.list_applied_filters())
+        if filters_changed:
             vtree.reset_filters(refresh=False)
+        # The paged search of the closed tasks is only started again if
+        # something changed, since it empties the pane first
+        keep_closed_search = search_filter == SEARCH_PAGE_FILTER and \
+            not filters_changed and search == self.closed_search_query
         # Browsing and applying filters. For performance optimization, only
         # allowing liblarch to trigger a refresh on last item. This way the
         # refresh is never triggered more than once and we let the possibility
         # to liblarch not to trigger refresh is filters did not change.
         for filter_name in filters:
             is_last = filter_name == filters[-1]
-            if filter_name == SEARCH_TAG:
-                self._try_filter_by_query(search, refresh=is_last)
+            if filter_name == search_filter:
+                if not keep_closed_search:
+                    self._try_filter_by_query(search, refresh=is_last)
             else:
                 vtree.apply_filter(filter_name, refresh=is_last)
 
@@ -24,7 +24,7 @@ from typing import Dict
 from gettext import gettext as _
 
 from GTG.core.dates import Date
-from GTG.gtk.editor.taskview import TAG_REGEX
+from GTG.core.content import TAG_REGEX
 
 
 TAGS_TOKEN = (
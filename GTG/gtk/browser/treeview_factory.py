@@ -17,13 +17,10 @@
 # -----------------------------------------------------------------------------
 
 import locale
-from datetime import datetime
 import xml.sax.saxutils as saxutils
 
 from gi.repository import GObject, Gtk, Pango
 
-from GTG.core.search import parse_search_query, search_filter
-from GTG.core.tag import SEARCH_TAG
 from GTG.core.task import Task
 from gettext import gettext as _
 from GTG.gtk import colors
@@ -75,14 +72,9 @@ class TreeviewFactory():
         """Returns an ordered list of tags of a task"""
         tags = node.get_tags()
 
-        search_parent = self.req.get_tag(SEARCH_TAG)
-        for search_tag in search_parent.get_children():
+        for search_tag in self.req.get_task_saved_searches(node.get_id()):
             tag = self.req.get_tag(search_tag)
-            match = search_filter(
-                node,
-                parse_search_query(tag.get_attribute('query')),
-            )
-            if match and search_tag not in tags:
+            if tag is not None and tag not in tags:
                 tags.append(tag)
 
         tags.sort(key=lambda x: x.get_name())
@@ -166,16 +158,9 @@ class TreeviewFactory():
         return self.__date_comp_continue(task1, task2, order, t1, t2)
 
     def sort_by_closeddate(self, task1, task2, order):
-        t1 = task1.get_closed_date()
-        t2 = task2.get_closed_date()
-
-        # Convert both times to datetimes (accurate comparison)
-        if isinstance(t1, Date):
-            d = t1.date()
-            t1 = datetime(year=d.year, month=d.month, day=d.day)
-        if isinstance(t2, Date):
-            d = t2.date()
-            t2 = datetime(year=d.year, month=d.month, day=d.day)
+        # Compare the days of both dates
+        t1 = task1.get_closed_date().sort_key()
+        t2 = task2.get_closed_date().sort_key()
         return self.__date_comp_continue(task1, task2, order, t1, t2)
 
     def sort_by_title(self, task1, task2, order):
@@ -28,6 +28,7 @@ from gi.repository import Gtk, GLib, Gdk, GObject, GtkSource
 
 from GTG.core.requester import Requester
 import GTG.core.urlregex as url_regex
+from GTG.core.content import TAG_REGEX, INTERNAL_REGEX
 from webbrowser import open as openurl
 from gettext import gettext as _
 from typing import List
@@ -39,18 +40,6 @@ from GTG.gtk.editor.text_tags import (TitleTag, SubTaskTag, TaskTagTag,
 log = logging.getLogger(__name__)
 
 
-# Regex to find GTG's tags.
-# GTG Tags start with @ and can contain alphanumeric
-# characters and/or dashes
-TAG_REGEX = re.compile(r'\B\@\w+([\-\w+\.\+\%\$\\(\)\[\]\{\}\^\=\/\*])*')
-
-# Regex to find internal links
-# Starts with gtg:// followed by a UUID.
-INTERNAL_REGEX = re.compile((r'gtg:\/\/'
-                             r'[0-9a-f]{8}(?:-[0-9a-f]{4}){3}-[0-9a-f]{12}'),
-                            re.IGNORECASE)
-
-
 class TaskView(GtkSource.View):
     """Taskview widget
 
@@ -55,6 +55,12 @@ class GTGNamespace(Namespace):
         """The current project."""
         return self._app.req
 
+    @property
+    @Namespace.shortcut
+    def filter_stats(self):
+        """The statistics of the filters."""
+        return self._app.req.get_filter_stats()
+
 
 class DevConsolePlugin():
     """Open a window with a Python interpreter."""
@@ -121,6 +127,8 @@ class DevConsolePlugin():
                  '- app (The application class)\n'
                  '- req (The requester class)\n'
                  '- browser (The main window)\n'
+                 '- filter_stats (Time spent in the filters, see '
+                 'filter_stats.report() and filter_stats.dump(path))\n'
                  '\n'
                  'Type "help (<command>)" for more information.'
                  '\n\n')
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -----------------------------------------------------------------------------
+# Getting Things GNOME! - a personal organizer for the GNOME desktop
+# Copyright (c) 2008-2013 - Lionel Dricot & Bertrand Rousseau
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+
+"""
+Benchmark of due date constraint propagation.
+
+Builds a synthetic project tree of 5 levels (1 + 10 + 100 + 1000 + 10000
+tasks) in a blank datastore, then times Task.set_due_date() on the root
+(every descendant gets constrained) and on a leaf (every ancestor gets
+constrained). Run it from the top of the source tree:
+
+    python3 scripts/benchmark_due_dates.py [--branching 10] [--levels 5]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from GTG.core.datastore import DataStore  # noqa: E402
+from GTG.core.dates import Date  # noqa: E402
+
+
+def build_tree(req, branching, levels):
+    """Create the project tree and return its root and one of its leaves"""
+    root = req.new_task()
+    root.set_title('Project')
+    root.set_due_date(Date.parse('2030-12-31'))
+    level = [root]
+    count = 1
+    for depth in range(1, levels):
+        next_level = []
+        for parent in level:
+            for i in range(branching):
+                task = req.new_task()
+                task.set_title(f'Task {depth}.{i}')
+                # Avoid the date/tag inheritance of new children
+                task.set_to_keep()
+                parent.add_child(task.get_id())
+                task.due_date = Date.parse('2030-12-31')
+                next_level.append(task)
+        count += len(next_level)
+        level = next_level
+    return root, level[0], count
+
+
+def measure(label, func):
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print(f'{label:<45} {elapsed * 1000:10.1f} ms')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--branching', type=int, default=10)
+    parser.add_argument('--levels', type=int, default=5)
+    args = parser.parse_args()
+
+    req = DataStore().get_requester()
+    root, leaf, count = build_tree(req, args.branching, args.levels)
+    print(f'{count} tasks, {args.levels} levels')
+
+    measure('root due date moved earlier (all descendants)',
+            lambda: root.set_due_date(Date.parse('2030-06-30')))
+    measure('leaf due date moved later (all ancestors)',
+            lambda: leaf.set_due_date(Date.parse('2031-06-30')))
+    measure('root due date unset',
+            lambda: root.set_due_date(Date.no_date()))
+
+
+if __name__ == '__main__':
+    main()
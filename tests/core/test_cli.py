@@ -0,0 +1,98 @@
+# -----------------------------------------------------------------------------
+# Getting Things GNOME! - a personal organizer for the GNOME desktop
+# Copyright (c) 2008-2014 - Lionel Dricot & Bertrand Rousseau
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+
+import json
+from io import StringIO
+from unittest import TestCase
+
+from GTG.cli import build_parser, run
+from GTG.core.datastore import DataStore
+from GTG.core.dates import Date
+
+
+class TestCli(TestCase):
+    def setUp(self):
+        self.ds = DataStore()
+        self.milk = self.ds.new_task()
+        self.milk.set_title('Buy milk')
+        self.milk.add_tag('@shopping')
+        self.milk.set_due_date(Date('2021-03-01'))
+        self.report = self.ds.new_task()
+        self.report.set_title('Write report')
+        self.done = self.ds.new_task()
+        self.done.set_title('Call mom')
+        self.done.set_status(self.done.STA_DONE)
+
+    def run_command(self, *argv):
+        out = StringIO()
+        status = run(self.ds, build_parser().parse_args(argv), out)
+        return status, out.getvalue().splitlines()
+
+    def test_list(self):
+        status, lines = self.run_command('list')
+        self.assertEqual(0, status)
+        self.assertEqual([self.milk.get_id(), '2021-03-01', 'Buy milk',
+                          '@shopping'], lines[0].split('\t'))
+        self.assertEqual(2, len(lines))
+
+        _, lines = self.run_command('list', '--closed')
+        self.assertEqual([self.done.get_id()],
+                         [line.split('\t')[0] for line in lines])
+
+        _, lines = self.run_command('list', '--tag', 'shopping')
+        self.assertEqual([self.milk.get_id()],
+                         [line.split('\t')[0] for line in lines])
+
+    def test_search(self):
+        _, lines = self.run_command('search', '--all', '!not', 'report')
+        self.assertEqual({self.milk.get_id(), self.done.get_id()},
+                         {line.split('\t')[0] for line in lines})
+        status, _ = self.run_command('search', '!unknown')
+        self.assertEqual(2, status)
+
+    def test_fuzzy_search(self):
+        _, lines = self.run_command('search', '!fuzzy', 'reprot')
+        self.assertEqual([self.report.get_id()],
+                         [line.split('\t')[0] for line in lines])
+        _, lines = self.run_command('search', '!fuzzy', '"by milk shoping"')
+        self.assertEqual([self.milk.get_id()],
+                         [line.split('\t')[0] for line in lines])
+
+    def test_add(self):
+        _, [tid] = self.run_command('add', 'Pay', 'rent', 'due:2021-04-01',
+                                    'tags:home')
+        task = self.ds.get_task(tid)
+        self.assertEqual('Pay rent', task.get_title().strip())
+        self.assertEqual(Date('2021-04-01'), task.get_due_date())
+        self.assertEqual(['@home'], task.get_tags_name())
+
+    def test_done(self):
+        status, lines = self.run_command('done', 'Write report',
+                                         self.milk.get_id(), 'Unknown')
+        self.assertEqual(1, status)
+        self.assertEqual([self.report.get_id(), self.milk.get_id()], lines)
+        self.assertEqual(self.report.STA_DONE, self.report.get_status())
+        self.assertEqual(self.milk.STA_DONE, self.milk.get_status())
+
+    def test_export(self):
+        out = StringIO()
+        run(self.ds, build_parser().parse_args(['export']), out)
+        tasks = {task['id']: task for task in json.loads(out.getvalue())}
+        self.assertEqual(3, len(tasks))
+        self.assertEqual('Buy milk', tasks[self.milk.get_id()]['title'])
+        self.assertEqual('2021-03-01', tasks[self.milk.get_id()]['due'])
@@ -0,0 +1,96 @@
+# -----------------------------------------------------------------------------
+# Getting Things GNOME! - a personal organizer for the GNOME desktop
+# Copyright (c) 2008-2014 - Lionel Dricot & Bertrand Rousseau
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+
+from unittest import TestCase
+
+from GTG.core.content import (parse_content, render_content, strip_tags,
+                              remove_tag, rename_tag, get_subtask_ids,
+                              Span, TEXT, TAG, SUBTASK, INTERNAL_LINK, URL)
+
+UUID = '262d1410-71aa-4e35-abec-90ef1bab44d3'
+
+
+class TestContent(TestCase):
+
+    def test_empty(self):
+        self.assertEqual((), parse_content(''))
+        self.assertEqual((), parse_content(None))
+
+    def test_spans(self):
+        text = (f'@foo, @bar\n\nsee https://gnome.org and gtg://{UUID}\n'
+                f'{{! {UUID} !}}\nmail me@example.com')
+        spans = parse_content(text)
+        self.assertEqual(text, render_content(spans))
+        self.assertEqual([
+            (TAG, '@foo'), (TEXT, ', '), (TAG, '@bar'),
+            (TEXT, '\n\nsee '), (URL, 'https://gnome.org'),
+            (TEXT, ' and '), (INTERNAL_LINK, UUID), (TEXT, '\n'),
+            (SUBTASK, UUID), (TEXT, '\nmail me@example.com'),
+        ], [(span.kind, span.value) for span in spans])
+        self.assertEqual([UUID], get_subtask_ids(spans))
+
+    def test_tag_punctuation(self):
+        for text, expected in [
+            ('Call @bob. then see @a:b now', ['@bob', '@a:b']),
+            ('@x&y/z-1, @tag!', ['@x&y/z-1', '@tag']),
+            ('(@not, mail@not.org) @end.', ['@end']),
+        ]:
+            tags = [span.value for span in parse_content(text)
+                    if span.kind == TAG]
+            self.assertEqual(expected, tags, text)
+
+    def test_rename_with_punctuation(self):
+        spans = parse_content('Call @bob. then see @a:b now')
+        spans = rename_tag(rename_tag(spans, '@bob', '@robert'), '@a:b', '@ab')
+        self.assertEqual('Call @robert. then see @ab now',
+                         render_content(spans))
+
+    def test_strip_tags(self):
+        spans = parse_content('@foo, @bar @foo, text @foobar')
+        self.assertEqual('@bar text @foobar',
+                         render_content(strip_tags(spans, ['foo'])))
+
+    def test_remove_tag(self):
+        for text, expected in [
+            ('@foo, @bar', '@bar'),
+            ('@foo\n\ntext', 'text'),
+            ('some @foo text', 'some foo text'),
+            ('@foobar @foo.', '@foobar foo.'),
+        ]:
+            spans = parse_content(text)
+            self.assertEqual(expected,
+                             render_content(remove_tag(spans, '@foo')), text)
+
+    def test_rename_tag(self):
+        spans = parse_content('@foo @foobar me@foo.org')
+        self.assertEqual('@baz @foobar me@foo.org',
+                         render_content(rename_tag(spans, '@foo', '@baz')))
+        self.assertEqual(Span(TAG, '@baz', '@baz'),
+                         rename_tag(spans, '@foo', '@baz')[0])
+
+    def test_rename_to_existing_tag(self):
+        for text, expected in [
+            ('@foo, @bar\n\ntext', '@bar\n\ntext'),
+            ('@bar, @foo\n\ntext', '@bar\n\ntext'),
+            ('@foo, @foo, @bar', '@bar'),
+            ('@foo and @foo', '@bar and @bar'),
+        ]:
+            spans = parse_content(text)
+            self.assertEqual(expected,
+                             render_content(rename_tag(spans, '@foo', '@bar')),
+                             text)
@@ -0,0 +1,522 @@
+# -----------------------------------------------------------------------------
+# Getting Things GNOME! - a personal organizer for the GNOME desktop
+# Copyright (c) 2008-2014 - Lionel Dricot & Bertrand Rousseau
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+
+from datetime import date, timedelta
+import threading
+from unittest import TestCase
+from unittest.mock import Mock, patch
+
+from GTG.core.dates import Date
+from GTG.core.datastore import DataStore, TaskSource
+from GTG.core.search import search_filter
+from GTG.core.tag import ALLTASKS_TAG, NOTAG_TAG
+from GTG.core.task import Task
+
+
+class TestSyncCoalescing(TestCase):
+    def setUp(self):
+        self.ds = DataStore()
+        self.task = self.ds.new_task()
+
+    def edit(self):
+        self.task.set_title('Title')
+        self.task.set_text('Some text')
+        self.task.add_tag('@tag')
+
+    def test_sync_is_immediate_by_default(self):
+        with patch.object(self.task, 'modified') as modified:
+            self.edit()
+            self.assertTrue(modified.call_count > 1)
+
+    def test_coalesced_syncs_are_flushed_once(self):
+        self.ds.coalesce_syncs = True
+        with patch.object(self.task, 'modified') as modified:
+            self.edit()
+            modified.assert_not_called()
+            self.ds.requester.flush_syncs()
+            modified.assert_called_once_with()
+
+    def test_batch_flushes_coalesced_syncs(self):
+        self.ds.coalesce_syncs = True
+        with patch.object(self.task, 'modified') as modified:
+            self.task.set_title('Before')
+            with self.ds.batch():
+                self.edit()
+            modified.assert_called_once_with()
+            self.ds.flush_deferred_syncs()
+            modified.assert_called_once_with()
+
+    def test_syncs_from_threads(self):
+        self.ds.coalesce_syncs = True
+        tasks = [self.ds.new_task() for _ in range(4)]
+        threads = [threading.Thread(target=lambda task=task: [
+                       task.sync() for _ in range(50)])
+                   for task in tasks]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual({task.get_id() for task in tasks},
+                         set(self.ds._deferred_syncs))
+        self.ds.flush_deferred_syncs()
+        self.assertEqual({}, self.ds._deferred_syncs)
+
+
+class TestBatch(TestCase):
+    def setUp(self):
+        self.ds = DataStore()
+        self.parent = self.ds.new_task()
+        self.children = [self.ds.new_task() for _ in range(3)]
+        for child in self.children:
+            self.parent.add_child(child.get_id())
+
+    def test_nested_batch_flushes_at_outermost_exit(self):
+        with patch.object(self.ds, 'flush_deferred_syncs',
+                          wraps=self.ds.flush_deferred_syncs) as flush:
+            with self.ds.batch():
+                with self.ds.batch():
+                    self.children[0].set_title('inner')
+                flush.assert_not_called()
+                self.children[1].set_title('outer')
+            flush.assert_called_once_with()
+
+    def test_each_task_is_notified_once(self):
+        tasks = [self.parent] + self.children
+        patches = [patch.object(task, 'modified') for task in tasks]
+        mocks = [p.start() for p in patches]
+        for p in patches:
+            self.addCleanup(p.stop)
+
+        with self.ds.batch():
+            with self.ds.batch():
+                for child in self.children:
+                    child.set_title('title')
+                    child.set_status(Task.STA_DONE)
+                    self.ds.refresh_task(self.parent.get_id())
+            for mock in mocks:
+                mock.assert_not_called()
+            self.parent.set_title('parent')
+
+        for mock in mocks:
+            mock.assert_called_once_with()
+
+    def test_refresh_outside_batch(self):
+        with patch.object(self.parent, 'modified') as modified:
+            self.ds.refresh_task(self.parent.get_id())
+            modified.assert_called_once_with()
+
+
+class TestRecurringDuplication(TestCase):
+    def setUp(self):
+        self.ds = DataStore()
+        self.root = self.ds.new_task()
+        self.root.set_title('root')
+        self.root.add_tag('@tag')
+        for title in ('first', 'second'):
+            child = self.ds.new_task()
+            child.set_title(title)
+            self.root.add_child(child.tid)
+        self.root.set_recurring(True, 'day')
+
+    def test_subtree_is_duplicated_at_once(self):
+        with patch.object(self.ds, 'add_new_tasks',
+                          wraps=self.ds.add_new_tasks) as add_new_tasks:
+            new_tid = self.root.duplicate_recursively()
+            add_new_tasks.assert_called_once()
+
+        copy = self.ds.get_task(new_tid)
+        self.assertEqual('root', copy.get_title())
+        self.assertEqual(self.root.get_next_occurrence(), copy.get_due_date())
+        children = [self.ds.get_task(tid) for tid in copy.get_children()]
+        self.assertEqual(['first', 'second'],
+                         [child.get_title() for child in children])
+        for child in children:
+            self.assertEqual([new_tid], child.get_parents())
+            self.assertEqual(['@tag'], child.get_tags_name())
+            self.assertEqual('day', child.get_recurring_term())
+            self.assertEqual(copy.get_due_date(), child.get_due_date())
+
+
+class TestTagCounts(TestCase):
+    def setUp(self):
+        self.ds = DataStore()
+        self.parent = self.ds.new_tag('@parent')
+        self.child = self.ds.new_tag('@child')
+        self.child.set_parent('@parent')
+
+    def test_counts_follow_tasks(self):
+        task = self.ds.new_task()
+        task.add_tag('@child')
+        self.assertEqual(1, self.child.get_active_tasks_count())
+        self.assertEqual(1, self.parent.get_active_tasks_count())
+
+        task.set_status(task.STA_DONE)
+        self.assertEqual(0, self.child.get_active_tasks_count())
+        self.assertEqual(1, self.child.get_total_tasks_count())
+
+        self.ds.requester.delete_task(task.get_id())
+        self.assertEqual(0, self.child.get_total_tasks_count())
+
+    def test_nonactionable_tags(self):
+        task = self.ds.new_task()
+        task.add_tag('@child')
+        no_disabled_tag = self.ds.treefactory.no_disabled_tag
+        self.assertTrue(no_disabled_tag(task))
+
+        self.parent.set_attribute('nonactionable', 'True')
+        self.assertEqual({'@parent', '@child'},
+                         self.ds.get_nonactionable_tags())
+        self.assertFalse(no_disabled_tag(task))
+
+        self.child.remove_parent('@parent')
+        self.assertTrue(no_disabled_tag(task))
+        self.child.set_attribute('nonactionable', 'True')
+        self.assertFalse(no_disabled_tag(task))
+
+    def test_filter_change_is_not_synced(self):
+        backend = Mock()
+        backend.get_id.return_value = 'backend'
+        backend.get_attached_tags.return_value = [ALLTASKS_TAG]
+        source = TaskSource(self.ds.requester, backend, self.ds)
+        source._connect_signals()
+        task = self.ds.new_task()
+        task.add_tag('@child')
+
+        with patch.object(source, 'queue_set_task') as queue_set_task, \
+                patch.object(task, 'modified',
+                             wraps=task.modified) as modified:
+            self.parent.set_attribute('nonactionable', 'True')
+            modified.assert_called_once_with()
+            queue_set_task.assert_not_called()
+
+    def test_related_tasks(self):
+        tagged = self.ds.new_task()
+        tagged.add_tag('@child')
+        done = self.ds.new_task()
+        done.add_tag('@parent')
+        done.set_status(done.STA_DONE)
+        untagged = self.ds.new_task()
+
+        self.assertEqual({tagged.get_id(), done.get_id()},
+                         set(self.parent.get_related_tasks()))
+        self.assertEqual([tagged.get_id()], self.child.get_related_tasks())
+        alltag = self.ds.get_tag(ALLTASKS_TAG)
+        self.assertEqual({tagged.get_id(), untagged.get_id()},
+                         set(alltag.get_related_tasks()))
+        notag = self.ds.get_tag(NOTAG_TAG)
+        self.assertEqual([untagged.get_id()], notag.get_related_tasks())
+
+    def test_delete_tag(self):
+        first = self.ds.new_task()
+        first.add_tag('@child')
+        second = self.ds.new_task()
+        second.add_tag('@child')
+
+        self.ds.requester.delete_tag('@child')
+        self.assertEqual([], first.get_tags_name())
+        self.assertEqual([], second.get_tags_name())
+        self.assertEqual([], self.child.get_related_tasks())
+
+
+class TestTagRename(TestCase):
+    def setUp(self):
+        self.ds = DataStore()
+        self.tag = self.ds.new_tag('@old', {'color': '#ff0000'})
+        self.task = self.ds.new_task()
+        self.task.set_text('@old, @other\n\nmail me@old.org')
+        self.task.tag_added('@old')
+        self.task.tag_added('@other')
+
+    def test_rename(self):
+        tid = self.tag.tid
+        self.ds.rename_tag('@old', '@new')
+
+        self.assertIsNone(self.ds.get_tag('@old'))
+        new_tag = self.ds.get_tag('@new')
+        self.assertEqual(tid, new_tag.tid)
+        self.assertEqual('#ff0000', new_tag.get_attribute('color'))
+        self.assertEqual(['@new', '@other'], self.task.get_tags_name())
+        self.assertEqual('@new, @other\n\nmail me@old.org',
+                         self.task.get_text())
+        self.assertEqual(1, new_tag.get_total_tasks_count())
+
+    def test_rename_with_punctuation(self):
+        task = self.ds.new_task()
+        task.set_text('@bob, @a:b\n\nCall @bob. then see @a:b now')
+        task.tag_added('@bob')
+        task.tag_added('@a:b')
+        self.ds.rename_tag('@bob', '@robert')
+        self.ds.rename_tag('@a:b', '@ab')
+
+        self.assertEqual('@robert, @ab\n\nCall @robert. then see @ab now',
+                         task.get_text())
+        self.assertEqual(['@robert', '@ab'], task.get_tags_name())
+
+    def test_rename_keeps_parents(self):
+        for parent in ('@first', '@second'):
+            self.ds.new_tag(parent)
+            self.tag.add_parent(parent)
+        self.ds.rename_tag('@old', '@new')
+
+        self.assertEqual({'@first', '@second'},
+                         set(self.ds.get_tag('@new').get_parents()))
+
+    def test_merge(self):
+        target = self.ds.get_tag('@other')
+        target.set_attribute('color', '#00ff00')
+        self.ds.merge_tags('@old', '@other')
+
+        self.assertIsNone(self.ds.get_tag('@old'))
+        self.assertEqual('#00ff00', target.get_attribute('color'))
+        self.assertEqual(['@other'], self.task.get_tags_name())
+        self.assertEqual('@other\n\nmail me@old.org',
+                         self.task.get_text())
+
+
+class TestTextSearch(TestCase):
+    def setUp(self):
+        self.ds = DataStore()
+        self.milk = self.ds.new_task()
+        self.milk.set_title('Buy milk')
+        self.bread = self.ds.new_task()
+        self.bread.set_title('Buy bread')
+        self.bread.set_text('no milk')
+
+    def search(self, query):
+        parameters = self.ds.get_search_parameters(query)
+        return {tid for tid in self.ds.get_all_tasks()
+                if search_filter(self.ds.get_task(tid), parameters)}
+
+    def test_words(self):
+        self.assertEqual({self.milk.get_id(), self.bread.get_id()},
+                         self.search('milk'))
+        self.assertEqual({self.bread.get_id()}, self.search('bread'))
+        self.assertEqual({self.milk.get_id()}, self.search('!not bread'))
+
+    def test_follows_changes(self):
+        self.assertEqual({self.bread.get_id()}, self.search('bread'))
+        self.milk.set_text('and bread')
+        self.milk.sync()
+        self.assertEqual({self.milk.get_id(), self.bread.get_id()},
+                         self.search('bread'))
+        self.ds.requester.delete_task(self.bread.get_id())
+        self.assertEqual({self.milk.get_id()}, self.search('bread'))
+
+
+class TestSavedSearches(TestCase):
+    def setUp(self):
+        self.ds = DataStore()
+        self.task = self.ds.new_task()
+        self.task.set_title('Buy milk')
+
+    def test_memberships(self):
+        tid = self.task.get_id()
+        self.assertEqual((), self.ds.get_task_saved_searches(tid))
+
+        milk = self.ds.new_search_tag('milk', 'milk', save=False).get_name()
+        bread = self.ds.new_search_tag('bread', 'bread', save=False).get_name()
+        self.assertEqual((milk,), self.ds.get_task_saved_searches(tid))
+
+        self.task.set_title('Buy bread')
+        self.assertEqual((bread,), self.ds.get_task_saved_searches(tid))
+
+        self.ds.remove_tag(bread)
+        self.assertEqual((), self.ds.get_task_saved_searches(tid))
+
+
+class TestFindTasks(TestCase):
+    def setUp(self):
+        self.ds = DataStore()
+        self.milk = self.ds.new_task()
+        self.milk.set_title('Buy milk')
+        self.report = self.ds.new_task()
+        self.report.set_title('Write the report')
+
+    def test_find_tasks(self):
+        self.assertEqual([self.report.get_id()],
+                         self.ds.find_tasks('reprot'))
+
+    def test_fuzzy_search(self):
+        parameters = self.ds.get_search_parameters('!fuzzy "buy mlik"')
+        self.assertTrue(search_filter(self.milk, parameters))
+        self.assertFalse(search_filter(self.report, parameters))
+
+        self.report.set_title('Buy more milk')
+        parameters = self.ds.get_search_parameters('!fuzzy "buy mlik"')
+        self.assertTrue(search_filter(self.report, parameters))
+
+    def test_get_task_id(self):
+        req = self.ds.requester
+        self.assertEqual(self.milk.get_id(), req.get_task_id('buy MILK'))
+        self.assertIsNone(req.get_task_id('buy'))
+        self.milk.set_status(self.milk.STA_DONE)
+        self.assertIsNone(req.get_task_id('Buy milk'))
+
+
+class TestClosedSearch(TestCase):
+    def test_most_recent_first(self):
+        ds = DataStore()
+        for title, closed_date in [('old', '2020-01-01'),
+                                   ('recent', '2021-01-01'),
+                                   ('middle', '2020-06-01')]:
+            task = ds.new_task()
+            task.set_title(f'{title} report')
+            task.set_status(task.STA_DONE, donedate=Date(closed_date))
+        ds.new_task().set_title('open report')
+
+        search = ds.search_closed_tasks(ds.get_search_parameters('report'))
+        titles = [ds.get_task(tid).get_title() for tid in search.next_page()]
+        self.assertEqual(['recent report', 'middle report', 'old report'],
+                         titles)
+        self.assertTrue(search.is_done())
+
+    def test_follows_closed_tasks(self):
+        ds = DataStore()
+        tasks = [ds.new_task() for _ in range(3)]
+        for day, task in enumerate(tasks, 1):
+            task.set_title('report')
+            task.set_status(task.STA_DONE, donedate=Date(f'2021-01-0{day}'))
+        parameters = ds.get_search_parameters('report')
+
+        def results():
+            return ds.search_closed_tasks(parameters).next_page()
+
+        ids = [task.get_id() for task in tasks]
+        self.assertEqual(ids[::-1], results())
+        self.assertEqual(ids[::-1], results())
+
+        tasks[2].set_status(Task.STA_ACTIVE)
+        self.assertEqual([ids[1], ids[0]], results())
+
+        tasks[0].set_status(Task.STA_DONE, donedate=Date('2021-02-01'))
+        self.assertEqual([ids[0], ids[1]], results())
+
+        tasks[2].set_status(Task.STA_DISMISSED, donedate=Date('2021-03-01'))
+        self.assertEqual([ids[2], ids[0], ids[1]], results())
+
+        ds.requester.delete_task(ids[0])
+        self.assertEqual([ids[2], ids[1]], results())
+
+
+class TestWorkview(TestCase):
+    def setUp(self):
+        self.ds = DataStore()
+        self.parent = self.ds.new_task()
+        self.child = self.parent.new_subtask()
+        self.factory = self.ds.treefactory
+
+    def test_active_children(self):
+        self.assertEqual(1, self.parent.count_active_children())
+        self.assertFalse(self.factory.is_workable(self.parent))
+        self.assertFalse(self.factory.workview(self.parent))
+
+        self.child.set_status(self.child.STA_DONE)
+        self.assertEqual(0, self.parent.count_active_children())
+        self.assertTrue(self.factory.is_workable(self.parent))
+        self.assertTrue(self.factory.workview(self.parent))
+
+    def test_new_child(self):
+        self.child.set_status(self.child.STA_DONE)
+        self.assertTrue(self.factory.workview(self.parent))
+        self.parent.new_subtask()
+        self.assertFalse(self.factory.workview(self.parent))
+
+    def test_count_follows_changes(self):
+        self.assertEqual(1, self.parent.count_active_children())
+        with patch.object(self.parent, 'get_tree') as get_tree:
+            other = self.parent.new_subtask()
+            self.assertEqual(2, self.parent.count_active_children())
+            self.child.set_status(self.child.STA_DONE)
+            self.assertEqual(1, self.parent.count_active_children())
+            self.child.set_status(self.child.STA_ACTIVE)
+            self.assertEqual(2, self.parent.count_active_children())
+
+            other.remove_parent(self.parent.get_id())
+            self.assertEqual(1, self.parent.count_active_children())
+            other.add_parent(self.parent.get_id())
+            self.assertEqual(2, self.parent.count_active_children())
+            other.set_parent(None)
+            self.assertEqual(1, self.parent.count_active_children())
+            get_tree.assert_not_called()
+
+    def test_modified_forwards_priority(self):
+        generation = self.ds.tasks_generation
+        with patch('GTG.core.task.TreeNode.modified') as modified:
+            self.child.modified(priority='high')
+        modified.assert_called_once_with(self.child, 'high')
+        self.assertNotEqual(generation, self.ds.tasks_generation)
+
+    def test_workview_is_shared(self):
+        with patch.object(self.factory, 'is_started',
+                          return_value=True) as is_started:
+            self.factory.workview(self.child)
+            self.factory.workstarted(self.child)
+            self.factory.worktostart(self.child)
+            self.assertEqual(1, is_started.call_count)
+
+            self.child.set_title('changed')
+            self.factory.workview(self.child)
+            self.assertEqual(2, is_started.call_count)
+
+
+class TestDayChange(TestCase):
+    def setUp(self):
+        self.ds = DataStore()
+        self.today = date.today()
+        self.ds.get_tasks_changed_by_day(self.today)
+
+    def test_changed_by_day(self):
+        due = self.ds.new_task()
+        due.set_due_date(Date(self.today + timedelta(days=3)))
+        started = self.ds.new_task()
+        started.set_start_date(Date(self.today + timedelta(days=1)))
+        fuzzy = self.ds.new_task()
+        fuzzy.set_due_date(Date.soon())
+        self.ds.new_task()
+
+        changed = self.ds.get_tasks_changed_by_day
+        self.assertEqual({started.get_id()},
+                         changed(self.today + timedelta(days=1)))
+        self.assertEqual({due.get_id(), started.get_id()},
+                         changed(self.today + timedelta(days=2)))
+        self.assertEqual({due.get_id()},
+                         changed(self.today + timedelta(days=10)))
+        self.assertEqual(set(), changed(self.today + timedelta(days=20)))
+
+    def test_backends_receive_nothing_on_rollover(self):
+        backend = Mock()
+        backend.get_id.return_value = 'backend'
+        backend.get_attached_tags.return_value = [ALLTASKS_TAG]
+        source = TaskSource(self.ds.requester, backend, self.ds)
+        source._connect_signals()
+        task = self.ds.new_task()
+        task.set_due_date(Date(self.today + timedelta(days=1)))
+        source.to_set.clear()
+
+        with patch.object(source, 'queue_set_task') as queue_set_task:
+            tomorrow = self.today + timedelta(days=1)
+            tids = self.ds.get_tasks_changed_by_day(tomorrow)
+            self.assertEqual({task.get_id()}, tids)
+            with patch.object(task, 'modified',
+                              wraps=task.modified) as modified:
+                self.ds.refresh_task_views(tids)
+                modified.assert_called_once_with()
+            queue_set_task.assert_not_called()
+
+            task.set_title('Edited')
+            queue_set_task.assert_called_with(task.get_id(), None)
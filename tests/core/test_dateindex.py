@@ -0,0 +1,61 @@
+# -----------------------------------------------------------------------------
+# Getting Things GNOME! - a personal organizer for the GNOME desktop
+# Copyright (c) 2008-2014 - Lionel Dricot & Bertrand Rousseau
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+
+from datetime import date
+from unittest import TestCase
+
+from GTG.core.dateindex import DateBoundaryIndex
+
+
+class TestDateBoundaryIndex(TestCase):
+    def setUp(self):
+        self.days = {}
+        self.index = DateBoundaryIndex(self.days.get, date(2021, 3, 1))
+
+    def set_days(self, tid, days):
+        if days is None:
+            self.days.pop(tid, None)
+        else:
+            self.days[tid] = days
+        self.index.invalidate(tid)
+
+    def test_changed_tasks(self):
+        self.set_days('1', [date(2021, 3, 2), date(2021, 3, 5)])
+        self.set_days('2', [date(2021, 3, 4)])
+        self.set_days('3', [date(2021, 2, 20)])
+        self.set_days('4', [])
+
+        self.assertEqual(set(), self.index.pop_changed(date(2021, 3, 1)))
+        self.assertEqual({'1'}, self.index.pop_changed(date(2021, 3, 2)))
+        self.assertEqual(set(), self.index.pop_changed(date(2021, 3, 3)))
+        # several days at once, as when resuming from suspend
+        self.assertEqual({'1', '2'}, self.index.pop_changed(date(2021, 3, 6)))
+        self.assertEqual(set(), self.index.pop_changed(date(2021, 4, 1)))
+
+    def test_changed_days(self):
+        self.set_days('1', [date(2021, 3, 2)])
+        self.index.pop_changed(date(2021, 3, 1))
+        self.set_days('1', [date(2021, 3, 3)])
+        self.assertEqual(set(), self.index.pop_changed(date(2021, 3, 2)))
+        self.assertEqual({'1'}, self.index.pop_changed(date(2021, 3, 3)))
+
+    def test_removed_task(self):
+        self.set_days('1', [date(2021, 3, 2)])
+        self.index.pop_changed(date(2021, 3, 1))
+        self.set_days('1', None)
+        self.assertEqual(set(), self.index.pop_changed(date(2021, 3, 2)))
@@ -0,0 +1,65 @@
+# -----------------------------------------------------------------------------
+# Getting Things GNOME! - a personal organizer for the GNOME desktop
+# Copyright (c) 2008-2014 - Lionel Dricot & Bertrand Rousseau
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+
+import json
+import os
+import tempfile
+from unittest import TestCase
+
+from GTG.core.filterstats import FilterStats
+
+
+def is_even(number, parameters=None):
+    return number % 2 == 0
+
+
+class TestFilterStats(TestCase):
+    def test_disabled(self):
+        stats = FilterStats(enabled=False)
+        self.assertIs(is_even, stats.wrap('even', is_even))
+        self.assertEqual([], stats.get_stats())
+
+    def test_calls(self):
+        stats = FilterStats(enabled=True)
+        even = stats.wrap('even', is_even)
+        stats.wrap('unused', is_even)
+        self.assertTrue(even(2, parameters={}))
+        self.assertFalse(even(3))
+
+        [even_stats] = stats.get_stats()
+        self.assertEqual('even', even_stats['name'])
+        self.assertEqual(2, even_stats['calls'])
+        self.assertLessEqual(even_stats['p50'], even_stats['p99'])
+        self.assertLessEqual(even_stats['p99'], even_stats['total'])
+
+        stats.reset()
+        self.assertEqual([], stats.get_stats())
+
+        even(4)
+        [even_stats] = stats.get_stats()
+        self.assertEqual(1, even_stats['calls'])
+
+    def test_dump(self):
+        stats = FilterStats(enabled=True)
+        stats.wrap('even', is_even)(4)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'stats.json')
+            stats.dump(path)
+            with open(path) as stats_file:
+                self.assertEqual(stats.get_stats(), json.load(stats_file))
+        self.assertIn('even', stats.report())
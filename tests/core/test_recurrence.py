@@ -0,0 +1,105 @@
+# -----------------------------------------------------------------------------
+# Getting Things GNOME! - a personal organizer for the GNOME desktop
+# Copyright (c) 2008-2014 - Lionel Dricot & Bertrand Rousseau
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+
+from datetime import date
+from unittest import TestCase
+
+from GTG.core.dates import Date
+from GTG.core.recurrence import RecurrenceRule, compile_recurring_term
+
+
+class TestRecurrence(TestCase):
+
+    def test_compile(self):
+        for term, kind, value in [
+            ('day', RecurrenceRule.INTERVAL_DAYS, 1),
+            ('other-day', RecurrenceRule.INTERVAL_DAYS, 2),
+            ('Week', RecurrenceRule.INTERVAL_DAYS, 7),
+            ('month', RecurrenceRule.INTERVAL_MONTHS, 1),
+            ('year', RecurrenceRule.INTERVAL_MONTHS, 12),
+            ('Tuesday', RecurrenceRule.WEEKDAY, 1),
+            ('31', RecurrenceRule.MONTH_DAY, 31),
+            ('0315', RecurrenceRule.YEAR_DAY, (3, 15)),
+            ('20200102', RecurrenceRule.FIXED, Date('2020-01-02')),
+        ]:
+            self.assertEqual(RecurrenceRule(kind, value),
+                             compile_recurring_term(term), term)
+
+    def test_compile_invalid(self):
+        for term in [None, 'fortnight', '00', '05', '1332']:
+            with self.assertRaises(ValueError, msg=term):
+                compile_recurring_term(term)
+
+    def test_compile_is_cached(self):
+        self.assertIs(compile_recurring_term('week'),
+                      compile_recurring_term('week'))
+
+    def test_first_occurrence(self):
+        start = date(2020, 1, 15)  # Wednesday
+        for term, expected in [
+            ('day', date(2020, 1, 15)),
+            ('month', date(2020, 1, 15)),
+            ('wednesday', date(2020, 1, 22)),
+            ('friday', date(2020, 1, 17)),
+            ('15', date(2020, 2, 15)),
+            ('16', date(2020, 1, 16)),
+            ('0115', date(2020, 1, 15)),
+            ('0114', date(2021, 1, 14)),
+        ]:
+            rule = compile_recurring_term(term)
+            self.assertEqual(expected, rule.first_occurrence(start), term)
+
+    def test_next_occurrence(self):
+        after = date(2020, 1, 31)  # Friday
+        for term, expected in [
+            ('day', date(2020, 2, 1)),
+            ('other-day', date(2020, 2, 2)),
+            ('week', date(2020, 2, 7)),
+            ('month', date(2020, 2, 29)),
+            ('year', date(2021, 1, 31)),
+            ('friday', date(2020, 2, 7)),
+            ('monday', date(2020, 2, 3)),
+            ('31', date(2020, 3, 31)),
+            ('30', date(2020, 3, 30)),
+            ('0229', date(2020, 2, 29)),
+        ]:
+            rule = compile_recurring_term(term)
+            self.assertEqual(expected, rule.next_occurrence(after), term)
+
+    def test_next_occurrence_not_before(self):
+        after = date(2020, 1, 31)
+        not_before = date(2021, 6, 10)  # Thursday
+        for term, expected in [
+            ('day', date(2021, 6, 10)),
+            ('other-day', date(2021, 6, 10)),
+            ('week', date(2021, 6, 11)),
+            ('month', date(2021, 6, 30)),
+            ('year', date(2022, 1, 31)),
+            ('thursday', date(2021, 6, 10)),
+            ('31', date(2021, 7, 31)),
+            ('0229', date(2024, 2, 29)),
+        ]:
+            rule = compile_recurring_term(term)
+            self.assertEqual(expected,
+                             rule.next_occurrence(after, not_before), term)
+
+    def test_far_future_is_direct(self):
+        rule = compile_recurring_term('day')
+        after = date(2000, 1, 1)
+        self.assertEqual(date(9000, 1, 1),
+                         rule.next_occurrence(after, date(9000, 1, 1)))
@@ -18,7 +18,9 @@
 
 from unittest import TestCase
 
-from GTG.core.search import search_filter
+from GTG.core.search import (compile_search_query, search_filter,
+                             is_narrowing, parse_search_query, PagedSearch,
+                             SearchCache)
 from GTG.core.dates import Date
 
 d = Date.parse
@@ -38,6 +40,9 @@ class FakeTask():
     def get_excerpt(self, strip_tags=False):
         return self.body
 
+    def get_search_text(self):
+        return self.body.lower()
+
     def get_tags_name(self):
         return self.tags
 
@@ -205,3 +210,120 @@ class TestSearchFilter(TestCase):
                                       {'q': [("soon", True)]}))
         self.assertTrue(search_filter(FakeTask(due_date="someday"),
                                       {'q': [("someday", True)]}))
+
+    def test_predicate_is_kept(self):
+        p = {'q': [("word", True, "Milk")]}
+
+        self.assertTrue(search_filter(FakeTask(title="Buy milk"), p))
+        predicate = p['predicate']
+        self.assertFalse(search_filter(FakeTask(title="Buy bread"), p))
+        self.assertIs(predicate, p['predicate'])
+
+    def test_or_short_circuits(self):
+        checked = []
+
+        class CountingTask(FakeTask):
+            def get_due_date(self):
+                checked.append(self.title)
+                return super().get_due_date()
+
+        predicate = compile_search_query(
+            [("or", True, [("tag", True, "@a"), ("nodate", True)])])
+        self.assertTrue(predicate(CountingTask(title="a", tags=['@a'])))
+        self.assertEqual([], checked)
+        self.assertTrue(predicate(CountingTask(title="b")))
+        self.assertEqual(["b"], checked)
+
+
+class TestSearchCache(TestCase):
+
+    class CountingTask(FakeTask):
+        def __init__(self, tid, checked, **kwargs):
+            super().__init__(**kwargs)
+            self.tid = tid
+            self.checked = checked
+            self.modified = 0
+
+        def get_id(self):
+            return self.tid
+
+        def get_modified(self):
+            return self.modified
+
+        def get_content_version(self):
+            return 0
+
+        def get_title(self):
+            self.checked.append(self.tid)
+            return super().get_title()
+
+    def setUp(self):
+        self.checked = []
+        self.tasks = [
+            self.CountingTask('1', self.checked, title="buy milk"),
+            self.CountingTask('2', self.checked, title="buy bread"),
+            self.CountingTask('3', self.checked, title="call mom"),
+        ]
+        self.cache = SearchCache(parse_search_query)
+
+    def search(self, query):
+        del self.checked[:]
+        parameters = self.cache.get_parameters(query)
+        return [t.tid for t in self.tasks if search_filter(t, parameters)]
+
+    def test_is_narrowing(self):
+        def narrows(old, new):
+            return is_narrowing(parse_search_query(old)['q'],
+                                parse_search_query(new)['q'])
+
+        self.assertTrue(narrows('bu', 'buy'))
+        self.assertTrue(narrows('buy', 'buy milk'))
+        self.assertTrue(narrows('@a', '@a buy'))
+        self.assertFalse(narrows('buy milk', 'buy'))
+        self.assertFalse(narrows('@a', '@ab'))
+        self.assertFalse(narrows('!not bu', '!not buy'))
+        self.assertFalse(narrows('buy', 'bu'))
+
+    def test_narrowing_checks_previous_matches(self):
+        self.assertEqual(['1', '2'], self.search('bu'))
+        self.assertEqual(['1', '2', '3'], self.checked)
+
+        self.assertEqual(['1', '2'], self.search('buy'))
+        self.assertEqual(['1', '2'], self.checked)
+
+    def test_back_to_previous_query(self):
+        self.search('buy')
+        self.search('buy m')
+        self.tasks[2].title = "buy coffee"
+        self.tasks[2].modified += 1
+
+        self.assertEqual(['1', '2', '3'], self.search('buy'))
+        self.assertEqual(['3'], self.checked)
+
+    def test_relative_dates_are_not_cached(self):
+        self.cache.get_parameters('!today')
+        self.assertNotIn('results', self.cache.get_parameters('!today'))
+
+
+class TestPagedSearch(TestCase):
+
+    def setUp(self):
+        self.tasks = {str(i): FakeTask(title=f"task {i % 3}")
+                      for i in range(10)}
+
+    def test_pages(self):
+        search = PagedSearch(sorted(self.tasks), self.tasks.get,
+                             parse_search_query('"task 0"'), page_size=2)
+        self.assertEqual(['0', '3'], search.next_page())
+        self.assertFalse(search.is_done())
+        self.assertEqual(['6', '9'], search.next_page())
+        self.assertEqual([], search.next_page())
+        self.assertTrue(search.is_done())
+
+    def test_max_checks(self):
+        search = PagedSearch(sorted(self.tasks), self.tasks.get,
+                             parse_search_query('"task 2"'), max_checks=4)
+        self.assertEqual(['2'], search.next_page())
+        self.assertEqual(['5'], search.next_page())
+        self.assertEqual(['8'], search.next_page())
+        self.assertTrue(search.is_done())
@@ -42,6 +42,15 @@ class TestSearchQuery(TestCase):
         self.assertEqual(parse('"@gtg"'),
                          {'q': [("word", True, '@gtg')]})
 
+    def test_fuzzy(self):
+        self.assertEqual(parse('!fuzzy "yearly reprot" @gtg'),
+                         {'q': [("fuzzy", True, 'yearly reprot'),
+                                ("tag", True, 'gtg')]})
+        self.assertEqual(parse('!not !fuzzy milk'),
+                         {'q': [("fuzzy", False, 'milk')]})
+        self.assertRaises(InvalidQuery, parse, "!fuzzy")
+        self.assertRaises(InvalidQuery, parse, "!fuzzy !today")
+
     def test_only_not(self):
         self.assertRaises(InvalidQuery, parse, "!not")
 
@@ -17,8 +17,10 @@
 # -----------------------------------------------------------------------------
 
 from unittest import TestCase
+from unittest.mock import Mock
 
-from GTG.core.tag import Tag
+from GTG.core.content import TAG, parse_content
+from GTG.core.tag import Tag, extract_tags_from_text
 
 
 class TestTag(TestCase):
@@ -66,3 +68,39 @@ class TestTag(TestCase):
 
         self.assertEqual('foo', self.tag.get_name())
         self.assertEqual('foo', self.tag.get_attribute('name'))
+
+
+class TestExtractTags(TestCase):
+    def test_punctuation(self):
+        self.assertEqual(['@bob', '@a:b'], extract_tags_from_text(
+            'Call @bob. then see @a:b now'))
+        self.assertEqual(['@x&y/z-1', '@tag'],
+                         extract_tags_from_text('@x&y/z-1, @tag!'))
+        self.assertEqual([], extract_tags_from_text('mail@not.org @ @-'))
+
+    def test_same_as_content(self):
+        text = 'Call @bob. then (@not) see @a:b, @x&y/z now.'
+        self.assertEqual(extract_tags_from_text(text),
+                         [span.value for span in parse_content(text)
+                          if span.kind == TAG])
+
+
+class TestTagAttributeNotifications(TestCase):
+    def setUp(self):
+        self.req = Mock()
+        self.save = Mock()
+        self.tag = Tag('@foo', self.req)
+        self.tag.set_save_callback(self.save)
+        self.tag.notify_related_tasks = Mock()
+
+    def test_style_change_only_redraws(self):
+        self.tag.set_attribute('color', '#ff0000')
+        self.tag.del_attribute('color')
+        self.req.emit.assert_called_with('tag-style-changed', '@foo')
+        self.tag.notify_related_tasks.assert_not_called()
+        self.assertEqual(2, self.save.call_count)
+
+    def test_nonactionable_modifies_tasks(self):
+        self.tag.set_attribute('nonactionable', True)
+        self.tag.notify_related_tasks.assert_called_once_with()
+        self.req.emit.assert_not_called()
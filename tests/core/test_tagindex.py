@@ -0,0 +1,70 @@
+# -----------------------------------------------------------------------------
+# Getting Things GNOME! - a personal organizer for the GNOME desktop
+# Copyright (c) 2008-2014 - Lionel Dricot & Bertrand Rousseau
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+
+from unittest import TestCase
+
+from GTG.core.tag import ALLTASKS_TAG, NOTAG_TAG
+from GTG.core.tagindex import TagIndex
+
+
+class TestTagIndex(TestCase):
+    def setUp(self):
+        self.index = TagIndex()
+
+    def test_counts(self):
+        self.index.update('1', ['@a', '@b'], True)
+        self.index.update('2', ['@a'], False)
+        self.index.update('3', [], True)
+
+        self.assertEqual(2, self.index.count(['@a']))
+        self.assertEqual(1, self.index.count(['@a'], active_only=True))
+        self.assertEqual(2, self.index.count(['@a', '@b']))
+        self.assertEqual(0, self.index.count(['@c']))
+        self.assertEqual(3, self.index.count_all())
+        self.assertEqual(2, self.index.count_all(active_only=True))
+        self.assertEqual(1, self.index.count_untagged(active_only=True))
+
+    def test_changed_tags(self):
+        self.assertEqual({'@a', ALLTASKS_TAG, NOTAG_TAG},
+                         self.index.update('1', ['@a'], True))
+        self.assertEqual(set(), self.index.update('1', ['@a'], True))
+        self.assertEqual({'@b'}, self.index.update('1', ['@a', '@b'], True))
+        self.assertEqual({'@a', '@b', ALLTASKS_TAG, NOTAG_TAG},
+                         self.index.update('1', ['@a', '@b'], False))
+        self.assertEqual(0, self.index.count(['@a'], active_only=True))
+
+    def test_remove(self):
+        self.index.update('1', ['@a'], True)
+        self.assertEqual({'@a', ALLTASKS_TAG, NOTAG_TAG},
+                         self.index.remove('1'))
+        self.assertEqual(0, self.index.count(['@a']))
+        self.assertEqual(0, self.index.count_all())
+        self.assertEqual(set(), self.index.remove('1'))
+
+    def test_get_tasks(self):
+        self.index.update('1', ['@a'], True)
+        self.index.update('2', ['@b'], False)
+        self.index.update('3', [], False)
+
+        self.assertEqual({'1', '2'}, self.index.get_tasks(['@a', '@b']))
+        self.assertEqual({'1'}, self.index.get_tasks(['@a', '@b'], True))
+        self.assertEqual({'1', '2', '3'}, set(self.index.get_all()))
+        self.assertEqual({'3'}, self.index.get_untagged())
+        self.assertEqual(set(), self.index.get_untagged(active_only=True))
+        self.assertTrue(self.index.has_task('3'))
+        self.assertFalse(self.index.has_task('4'))
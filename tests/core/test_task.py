@@ -0,0 +1,168 @@
+# -----------------------------------------------------------------------------
+# Getting Things GNOME! - a personal organizer for the GNOME desktop
+# Copyright (c) 2008-2014 - Lionel Dricot & Bertrand Rousseau
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+
+
+from collections import Counter
+from unittest import TestCase
+from unittest.mock import Mock, patch
+
+from GTG.core.datastore import DataStore
+from GTG.core.dates import Date
+from GTG.core.task import Task
+
+
+class TestTaskExcerpt(TestCase):
+    def setUp(self):
+        self.task = Task('1', Mock())
+
+    def test_empty_content(self):
+        self.assertEqual('', self.task.get_excerpt())
+
+    def test_whole_content_without_blank_lines(self):
+        self.task.set_text('first\n\nsecond\nthird')
+        self.assertEqual('first\nsecond\nthird', self.task.get_excerpt())
+
+    def test_lines_and_chars(self):
+        self.task.set_text('first line\nsecond line')
+        self.assertEqual('first line', self.task.get_excerpt(lines=1))
+        self.assertEqual('first', self.task.get_excerpt(char=5))
+
+    def test_strip_tags(self):
+        self.task.tag_added('@foo')
+        self.task.set_text('@foo, @bar\nsome text')
+        self.assertEqual('@bar',
+                         self.task.get_excerpt(lines=1, strip_tags=True))
+
+    def test_strip_subtasks(self):
+        self.task.set_text('text\n{! 123 !}')
+        self.assertEqual('text', self.task.get_excerpt())
+
+    def test_excerpt_is_cached_per_content_version(self):
+        self.task.set_text('some text')
+        version = self.task.get_content_version()
+        self.assertIs(self.task.get_excerpt(), self.task.get_excerpt())
+        self.assertEqual(version, self.task.get_content_version())
+
+        self.task.set_text('other text')
+        self.assertNotEqual(version, self.task.get_content_version())
+        self.assertEqual('other text', self.task.get_excerpt())
+
+    def test_tag_change_invalidates_excerpt(self):
+        self.task.set_text('@foo text')
+        self.assertEqual('@foo text', self.task.get_excerpt(strip_tags=True))
+        self.task.tag_added('@foo')
+        self.assertEqual(' text', self.task.get_excerpt(strip_tags=True))
+
+    def test_search_text_is_lowercase(self):
+        self.task.set_text('Some TEXT')
+        self.assertEqual('some text', self.task.get_search_text())
+
+
+class TestTaskTags(TestCase):
+    def setUp(self):
+        closures = {'@parent': frozenset({'@parent', '@child'})}
+        req = Mock()
+        req.get_tag_closure.side_effect = \
+            lambda name: closures.get(name, frozenset({name}))
+        self.task = Task('1', req)
+
+    def test_no_tags(self):
+        self.assertTrue(self.task.has_tags(notag_only=True))
+        self.assertTrue(self.task.has_tags([]))
+        self.assertFalse(self.task.has_tags(['@foo']))
+
+    def test_has_own_tag(self):
+        self.task.tag_added('@foo')
+        self.assertFalse(self.task.has_tags(notag_only=True))
+        self.assertTrue(self.task.has_tags(['@foo']))
+        self.assertTrue(self.task.has_tags(['@bar', '@foo']))
+        self.assertFalse(self.task.has_tags(['@bar']))
+
+    def test_has_descendant_tag(self):
+        self.task.tag_added('@child')
+        self.assertTrue(self.task.has_tags(['@parent']))
+        self.assertFalse(self.task.has_tags(['@other']))
+
+    def test_tags_keep_their_order(self):
+        for tag in ('@b', '@a', '@c'):
+            self.task.tag_added(tag)
+        self.task.tag_added('@a')
+        self.assertEqual(['@b', '@a', '@c'], self.task.get_tags_name())
+
+
+class TestDueDatePropagation(TestCase):
+    def setUp(self):
+        self.ds = DataStore()
+        self.parent = self.ds.new_task()
+        self.child = self.ds.new_task()
+        self.grandchild = self.ds.new_task()
+        self.parent.add_child(self.child.get_id())
+        self.child.add_child(self.grandchild.get_id())
+        self.parent.set_due_date(Date('2021-03-20'))
+        self.child.set_due_date(Date('2021-03-10'))
+        self.grandchild.set_due_date(Date('2021-03-05'))
+
+    def assertDueDates(self, parent, child, grandchild):
+        self.assertEqual([Date(parent), Date(child), Date(grandchild)],
+                         [self.parent.get_due_date(),
+                          self.child.get_due_date(),
+                          self.grandchild.get_due_date()])
+
+    def test_parent_gets_earlier(self):
+        self.parent.set_due_date(Date('2021-03-08'))
+        self.assertDueDates('2021-03-08', '2021-03-08', '2021-03-05')
+
+        self.parent.set_due_date(Date('2021-03-01'))
+        self.assertDueDates('2021-03-01', '2021-03-01', '2021-03-01')
+
+    def test_child_gets_later(self):
+        self.grandchild.set_due_date(Date('2021-03-15'))
+        self.assertDueDates('2021-03-20', '2021-03-15', '2021-03-15')
+
+        self.grandchild.set_due_date(Date('2021-03-25'))
+        self.assertDueDates('2021-03-25', '2021-03-25', '2021-03-25')
+
+    def test_through_fuzzy_dates(self):
+        for fuzzy in (Date.soon(), Date.no_date()):
+            self.child.set_due_date(fuzzy)
+
+            self.parent.set_due_date(Date('2021-03-01'))
+            self.assertDueDates('2021-03-01', fuzzy, '2021-03-01')
+
+            self.grandchild.set_due_date(Date('2021-03-30'))
+            self.assertDueDates('2021-03-30', fuzzy, '2021-03-30')
+
+    def test_start_dates_are_clamped(self):
+        self.child.set_start_date(Date('2021-03-09'))
+        self.grandchild.set_start_date(Date('2021-03-04'))
+        self.parent.set_due_date(Date('2021-03-06'))
+        self.assertEqual(Date('2021-03-06'), self.child.get_start_date())
+        self.assertEqual(Date('2021-03-04'), self.grandchild.get_start_date())
+
+        self.grandchild.set_start_date(Date.someday())
+        self.parent.set_due_date(Date('2021-03-02'))
+        self.assertEqual(Date('2021-03-02'), self.child.get_start_date())
+        self.assertEqual(Date.someday(), self.grandchild.get_start_date())
+
+    def test_each_task_is_synced_once(self):
+        self.child.set_start_date(Date('2021-03-09'))
+        with patch.object(Task, 'sync', autospec=True) as sync:
+            self.parent.set_due_date(Date('2021-03-01'))
+        synced = Counter(call[0][0].get_id() for call in sync.call_args_list)
+        self.assertEqual({self.parent.get_id(): 1, self.child.get_id(): 1,
+                          self.grandchild.get_id(): 1}, synced)
@@ -0,0 +1,96 @@
+# -----------------------------------------------------------------------------
+# Getting Things GNOME! - a personal organizer for the GNOME desktop
+# Copyright (c) 2008-2014 - Lionel Dricot & Bertrand Rousseau
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+# -----------------------------------------------------------------------------
+
+from unittest import TestCase
+
+from GTG.core.textindex import FuzzyIndex, TextIndex
+
+
+class TestTextIndex(TestCase):
+    def setUp(self):
+        self.texts = {}
+        self.index = TextIndex(self.texts.get)
+
+    def set_text(self, tid, text):
+        if text is None:
+            self.texts.pop(tid, None)
+        else:
+            self.texts[tid] = text
+        self.index.invalidate(tid)
+
+    def test_candidates(self):
+        self.set_text('1', 'buy some milk')
+        self.set_text('2', 'call mom')
+        self.set_text('3', 'milkshake')
+
+        self.assertEqual({'1', '3'}, self.index.get_candidates('milk'))
+        self.assertEqual({'2'}, self.index.get_candidates('mom'))
+        self.assertEqual(set(), self.index.get_candidates('bread'))
+
+    def test_short_words(self):
+        self.set_text('1', 'go')
+        self.assertIsNone(self.index.get_candidates('go'))
+
+    def test_changes(self):
+        self.set_text('1', 'buy milk')
+        self.assertEqual({'1'}, self.index.get_candidates('milk'))
+
+        self.set_text('1', 'buy bread')
+        self.assertEqual(set(), self.index.get_candidates('milk'))
+        self.assertEqual({'1'}, self.index.get_candidates('bread'))
+
+        self.set_text('1', None)
+        self.assertEqual(set(), self.index.get_candidates('bread'))
+
+
+class TestFuzzyIndex(TestCase):
+    def setUp(self):
+        self.texts = {
+            '1': 'Buy milk @errands',
+            '2': 'Buy bread @errands',
+            '3': 'Call mom',
+            '4': 'Write the yearly report about milk production',
+        }
+        self.index = FuzzyIndex(self.texts.get)
+        for tid in self.texts:
+            self.index.invalidate(tid)
+
+    def test_search(self):
+        self.assertEqual(['1', '4'], self.index.search('milk'))
+        self.assertEqual(['1', '4', '2'], self.index.search('buy milk'))
+        self.assertEqual(['3'], self.index.search('call'))
+
+    def test_typos(self):
+        self.assertEqual(['2'], self.index.search('bred'))
+        self.assertEqual(['4'], self.index.search('yearly reprot'))
+        self.assertEqual(['2', '1'], self.index.search('bread errand'))
+
+    def test_limit(self):
+        self.assertEqual(['1'], self.index.search('milk', limit=1))
+
+    def test_changes(self):
+        self.texts['3'] = 'Call dad'
+        self.index.invalidate('3')
+        self.assertEqual([], self.index.search('mom'))
+        del self.texts['1']
+        self.index.invalidate('1')
+        self.assertEqual(['4'], self.index.search('milk'))
+
+    def test_candidates(self):
+        self.assertEqual({'1', '2'}, self.index.get_candidates('buy'))
+        self.assertEqual({'1'}, self.index.get_candidates('milk buy'))
@@ -16,11 +16,11 @@
 # this program.  If not, see <http://www.gnu.org/licenses/>.
 # -----------------------------------------------------------------------------
 
-from datetime import date, timedelta
+from datetime import date, datetime, timedelta
 from unittest import TestCase
 
 from gettext import gettext as _
-from GTG.core.dates import Date
+from GTG.core.dates import Date, work_day
 
 
 def next_month(aday, day=None):
@@ -145,3 +145,43 @@ class TestDates(TestCase):
             init_date, param, newtask, expected = data
             r = Date(init_date)._parse_only_month_day_for_recurrency(param, newtask)
             self.assertEqual(str(r), str(expected))
+
+    def test_compare_by_day(self):
+        today = date.today()
+        dates = [Date(today + timedelta(days=days))
+                 for days in (-1, 0, 14, 15, 16, 400)]
+        dates += [Date.soon(), Date.someday(), Date.no_date()]
+        for first in dates:
+            for second in dates:
+                a, b = first._cast_for_operation(second)
+                self.assertEqual(a < b, first < second)
+                self.assertEqual(a == b, first == second)
+                self.assertEqual(a >= b, first >= second)
+                self.assertEqual(a < b, first.sort_key() < second.sort_key())
+
+    def test_sort_key(self):
+        today = date.today()
+        self.assertEqual(today.toordinal(), Date.today().sort_key())
+        self.assertEqual(today.toordinal() + 15, Date.soon().sort_key())
+        self.assertEqual(Date('2021-03-01').sort_key(),
+                         Date('2021-03-01T10:30:00').sort_key())
+        self.assertLess(Date('2021-03-01T10:30:00'), Date('2021-03-01T11:00'))
+
+    def test_work_day(self):
+        self.assertEqual((date(2021, 3, 1), False),
+                         work_day(datetime(2021, 3, 1, 4, 59)))
+        self.assertEqual((date(2021, 3, 1), True),
+                         work_day(datetime(2021, 3, 1, 5, 0)))
+
+    def test_parse_is_cached(self):
+        self.assertIs(Date.parse('next week'), Date.parse('Next Week'))
+        self.assertIsNot(Date.parse('now'), Date.parse('now'))
+        for _ in range(2):
+            with self.assertRaises(ValueError):
+                Date.parse('not a date')
+
+        friday = Date('2021-03-01').parse_from_date('friday')
+        self.assertEqual(Date('2021-03-05'), friday)
+        self.assertIs(friday, Date('2021-03-01').parse_from_date('friday'))
+        self.assertEqual(Date('2021-03-12'),
+                         Date('2021-03-08').parse_from_date('friday'))